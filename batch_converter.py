@@ -2,26 +2,26 @@
 
 import os
 import sys
+import json
 import shutil
-import importlib
+import signal
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-def import_converter(module_name):
+from scripts import components
+from scripts import metrics
+from scripts.archive import configure, current_settings, thread_budget, COMPRESSION_PROFILES
+from scripts.catalog import Catalog
+from scripts.cache import ConversionCache, cache_key, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+
+def _move_into(file_path, dest_dir, description):
+    # Moves one file into an organized subfolder, warning instead of failing.
+    if not os.path.exists(file_path): return
     try:
-        # Import the module from the 'scripts' sub-directory.
-        module = importlib.import_module(f"scripts.{module_name}")
-        return getattr(module, "convert")
-    except ImportError as e:
-        print(f"[IMPORT ERROR] Could not load 'scripts/{module_name}.py'. Please check for missing files or typos.")
-        print(f"   -> Python's error was: {e}")
-        return None
-    except AttributeError:
-        print(f"[IMPORT ERROR] Found 'scripts/{module_name}.py', but could not find the function 'convert' inside it.")
-        return None
-
-# Attempt to load all available scripts.
-convert_dxvk = import_converter("dxvk_to_wcp")
-convert_dxvk_dev = import_converter("dxvk_dev_to_wcp")
-convert_vkd3d_proton = import_converter("vkd3d_proton_to_wcp")
+        shutil.move(file_path, dest_dir)
+    except shutil.Error as e:
+        print(f"[WARN] Could not move {description} '{os.path.basename(file_path)}': {e}")
 
 def organize_folder(folder_path, source_files):
     """Creates subdirectories and moves processed files for organization."""
@@ -34,63 +34,291 @@ def organize_folder(folder_path, source_files):
 
     # Move all original source archives.
     for file_path in source_files:
-        if os.path.exists(file_path):
-            try:
-                shutil.move(file_path, source_dir)
-            except shutil.Error as e:
-                print(f"[WARN] Could not move source file '{os.path.basename(file_path)}': {e}")
-    
+        _move_into(file_path, source_dir, "source file")
+
     # Scan for and move all new .wcp files.
     for filename in os.listdir(folder_path):
         if filename.endswith(".wcp"):
-            try:
-                shutil.move(os.path.join(folder_path, filename), output_dir)
-            except shutil.Error as e:
-                print(f"[WARN] Could not move output file '{filename}': {e}")
+            _move_into(os.path.join(folder_path, filename), output_dir, "output file")
+
+    # Only packages that are new or changed since the last run are decoded again.
+    indexed, _, removed = Catalog(output_dir).update()
+    if indexed or removed: print(f"Catalog updated: {indexed} package(s) indexed, {removed} removed.")
+
+def organize_job(folder_path, source_path, output_path):
+    """Organizes a single finished job, the incremental counterpart of organize_folder used by watch mode."""
+    output_dir = os.path.join(folder_path, "_wcp_output")
+    source_dir = os.path.join(folder_path, "_source_archives")
+    os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(source_dir, exist_ok=True)
+    _move_into(source_path, source_dir, "source file")
+    if output_path:
+        _move_into(output_path, output_dir, "output file")
+        Catalog(output_dir).add(os.path.join(output_dir, os.path.basename(output_path)))
+
+def find_jobs(folder_path, files_in_dir, component=None):
+    """
+    Matches each file against the component registry, returns (label, spec, path, options) jobs.
+    component (a registry name) converts every file with its extension, whatever the file is named.
+    """
+    jobs = []
+    for filename in files_in_dir:
+        full_path = os.path.join(folder_path, filename)
+        if not os.path.isfile(full_path): continue
+
+        # Dispatch the file to the component that handles its extension.
+        spec = components.match(filename, component)
+        if spec: jobs.append((spec["label"], spec, full_path, {}))
+    return jobs
+
+def unmatched_archives(folder_path, files_in_dir, component=None):
+    """Returns the files that look like archives (e.g. any .zip) but that no component picked by name."""
+    return sorted(filename for filename in files_in_dir if os.path.isfile(os.path.join(folder_path, filename))
+                  and components.is_archive_name(filename) and not components.match(filename, component))
+
+def resolve_job_metadata(jobs, mapping=None, interactive=True):
+    """Settles the version info of every job whose component asks for it (DXVK-dev) up front, so none of them has to prompt later."""
+    resolved = []
+    for label, spec, full_path, options in jobs:
+        if "metadata" in spec:
+            try: version_name, version_code = components.load(spec["metadata"])(full_path, mapping, interactive)
+            except Exception as e:
+                print(f"[ERROR] Skipping {os.path.basename(full_path)}, could not determine its version: {e}"); continue
+            options = {**options, "version_name": version_name, "version_code": version_code}
+        resolved.append((label, spec, full_path, options))
+    return resolved
+
+def _init_worker(threads, compression, reproducible, collect_metrics):
+    # Runs once in every pool process, before it picks up any job.
+    # Ctrl+C is handled by the main process, which lets running jobs finish cleanly.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    configure(threads=threads, compression=compression, reproducible=reproducible)
+    metrics.enable(collect_metrics)
+
+def _run_job(spec, full_path, options, record=None):
+    # Runs one conversion (here or in a pool worker), returns the .wcp path and its metrics record.
+    # record is the job's cache lookup record, if it had one, so its timing ends up in the same record.
+    # The engine, and with it the archive backends, is only imported once there is a job to run.
+    from scripts.engine import convert
+    metrics.begin_job(full_path, spec["name"], record)
+    output_path = convert(spec, full_path, **options)
+    return output_path, metrics.end_job(full_path, output_path)
+
+def _failed_record(spec, full_path, record=None):
+    # The record of a job whose worker died, built here: the main process has no current job for it.
+    metrics.begin_job(full_path, spec["name"], record)
+    return metrics.end_job(full_path, None)
+
+def check_cache(jobs, cache, compression, report=None):
+    """
+    Serves jobs from the conversion cache, returns ({source path: .wcp path} hits, {source path: key} misses,
+    remaining jobs, {source path: metrics record} of the misses, to be carried into their conversion).
+    """
+    hits, misses, remaining, records = {}, {}, [], {}
+    for job in jobs:
+        label, spec, full_path, options = job
+        metrics.begin_job(full_path, spec["name"])
+        with metrics.stage("cache_lookup"):
+            # The whole spec is part of the key, so editing a component's tables invalidates its cached outputs.
+            key = cache_key(full_path, spec["name"], compression=compression, reproducible=current_settings()["reproducible"], options=options, spec=spec)
+            output_path = cache.lookup(key, os.path.dirname(full_path))
+        if output_path:
+            print(f"[CACHE] {label}: {os.path.basename(full_path)} -> {os.path.basename(output_path)}")
+            hits[full_path] = output_path
+            if report: report.add(metrics.end_job(full_path, output_path, cache_hit=True))
+        else: misses[full_path], records[full_path] = key, metrics.detach_job(); remaining.append(job)
+    return hits, misses, remaining, records
+
+def _convert_serially(jobs, results, report, records):
+    for label, spec, full_path, options in jobs:
+        print("-" * 50); print(f"Found {label} file: {os.path.basename(full_path)}")
+        results[full_path], record = _run_job(spec, full_path, options, records.get(full_path))
+        if report: report.add(record)
+        print("-" * 50)
+
+def run_jobs(jobs, workers, cache=None, compression="default", report=None):
+    """Runs the conversion jobs, in parallel when workers > 1, and returns {source path: .wcp path or None}."""
+    results, misses, pending, records = {}, {}, jobs, {}
+    if cache is not None:
+        hits, misses, pending, records = check_cache(jobs, cache, compression, report)
+        results.update(hits)
+
+    if workers <= 1 or len(pending) <= 1: _convert_serially(pending, results, report, records)
+    else:
+        threads = thread_budget(workers)
+        print(f"Converting {len(pending)} file(s) with {workers} parallel workers ({threads} zstd thread(s) each)...")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(threads, compression, current_settings()["reproducible"], metrics.is_enabled())) as pool:
+            futures = {pool.submit(_run_job, spec, full_path, options, records.get(full_path)): (label, spec, full_path) for label, spec, full_path, options in pending}
+            for future in as_completed(futures):
+                label, spec, full_path = futures[future]
+                try: results[full_path], record = future.result()
+                except Exception as e:
+                    print(f"[ERROR] Worker failed on {os.path.basename(full_path)}: {e}")
+                    results[full_path], record = None, _failed_record(spec, full_path, records.get(full_path))
+                if report: report.add(record)
+                status = "done" if results[full_path] else "FAILED"
+                print(f"[{len(results)}/{len(jobs)}] {label}: {os.path.basename(full_path)} -> {status}")
+
+    # Remember every fresh conversion for the next run.
+    for full_path, key in misses.items():
+        if results.get(full_path): cache.store(key, results[full_path])
+    return results
+
+def watch_folder(folder_path, workers, cache=None, compression="default", dev_metadata=None, settle=3.0, force_polling=False, report=None, store_dir=None, component=None):
+    """
+    Runs until Ctrl+C: converts every compatible archive that lands in the folder once it is fully
+    written (size and mtime stable for `settle` seconds) and organizes each result as soon as it is done.
+    """
+    from scripts.watch import open_watcher, StabilityTracker
+    watcher, tracker = open_watcher(folder_path, force_polling), StabilityTracker(settle)
+    queued, in_flight, known = deque(), {}, set()
+
+    def finish(future):
+        label, spec, full_path, key, lookup = in_flight[future]
+        try: output_path, record = future.result()
+        except Exception as e:
+            print(f"[ERROR] Worker failed on {os.path.basename(full_path)}: {e}")
+            output_path, record = None, _failed_record(spec, full_path, lookup)
+        if report: report.add(record)
+        if output_path and key and cache is not None: cache.store(key, output_path)
+        print(f"{label}: {os.path.basename(full_path)} -> {os.path.basename(output_path) if output_path else 'FAILED'}")
+        organize_job(folder_path, full_path, output_path)
+        if output_path and store_dir: store_outputs(store_dir, folder_path, {full_path: output_path})
+
+    print(f"Watching {folder_path} for new archives ({watcher.kind}, {workers} worker(s)). Press Ctrl+C to stop.")
+
+    # Archives that were already waiting in the folder are picked up once at start.
+    for filename in os.listdir(folder_path): tracker.add(os.path.join(folder_path, filename))
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(thread_budget(workers), compression, current_settings()["reproducible"], metrics.is_enabled()))
+    # SIGTERM (e.g. from a service manager or Termux job) stops watch mode the same way as Ctrl+C.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        while True:
+            for filename in watcher.poll(0.5 if (len(tracker) or in_flight) else 2.0):
+                full_path = os.path.join(folder_path, filename)
+                if full_path not in known: tracker.add(full_path)
+
+            for full_path in tracker.ready():
+                if full_path in known or not os.path.isfile(full_path): continue
+                if unmatched_archives(folder_path, [os.path.basename(full_path)], component):
+                    print(f"[SKIP] {os.path.basename(full_path)}: not named like any known archive, use --type to pick its converter.")
+                    known.add(full_path); continue
+                for job in resolve_job_metadata(find_jobs(folder_path, [os.path.basename(full_path)], component), dev_metadata, interactive=False):
+                    known.add(full_path)
+                    print(f"New {job[0]} file: {os.path.basename(full_path)}")
+                    hits, misses, pending, records = check_cache([job], cache, compression, report) if cache is not None else ({}, {}, [job], {})
+                    if hits:
+                        organize_job(folder_path, full_path, hits[full_path])
+                        if store_dir: store_outputs(store_dir, folder_path, hits)
+                        known.discard(full_path)
+                    else: queued.append((job, misses.get(full_path), records.get(full_path)))
+
+            # Keep the pool fed but bounded, so a burst of new files never piles up inside the executor.
+            while queued and len(in_flight) < workers * 2:
+                (label, spec, full_path, options), key, lookup = queued.popleft()
+                in_flight[pool.submit(_run_job, spec, full_path, options, lookup)] = (label, spec, full_path, key, lookup)
+
+            for future in [future for future in in_flight if future.done()]:
+                finish(future); known.discard(in_flight.pop(future)[2])
+    except KeyboardInterrupt:
+        print(f"\nStopping watch mode, waiting for {len(in_flight)} running job(s)...")
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        watcher.close()
+    # Jobs that were still running when we stopped have finished now, organize them too.
+    for future in in_flight:
+        if not future.cancelled(): finish(future)
+
+def store_outputs(store_dir, folder_path, results):
+    """Adds the organized .wcp outputs of this batch to the blob store and reports its dedupe ratio."""
+    from scripts.blob_store import BlobStore
+    print("\n--- Updating Blob Store ---")
+    store = BlobStore(store_dir)
+    for output_path in filter(None, results.values()):
+        organized_path = os.path.join(folder_path, "_wcp_output", os.path.basename(output_path))
+        try: store.ingest(organized_path)
+        except Exception as e: print(f"[WARN] Could not add '{os.path.basename(output_path)}' to the store: {e}")
+    stats = store.stats()
+    print(f"Store holds {stats['packages']} package(s), dedupe ratio {stats['dedupe_ratio']:.2f}x.")
 
 def main():
     """Main function to run the batch processing and organization."""
+    parser = argparse.ArgumentParser(description="Converts every compatible archive in a folder to .wcp and organizes the results.")
+    parser.add_argument("folder", nargs="?", help="Folder containing the archives (prompted for if omitted).")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of archives to convert in parallel (0 = one per CPU core, default: 1).")
+    parser.add_argument("--compression", help=f"Compression profile: {', '.join(COMPRESSION_PROFILES)}, or custom zstd parameters such as 'level=19,window_log=27' (default: $WCP_COMPRESSION or 'default').")
+    parser.add_argument("--low-memory", action="store_true", help="For phones with little RAM: one job at a time, single-threaded zstd and the 'low-memory' compression profile (unless --compression is given).")
+    parser.add_argument("--reproducible", action="store_true", help="Write byte-identical .wcp files for identical inputs: normalized member metadata and deterministic compression (default: $WCP_REPRODUCIBLE).")
+    parser.add_argument("--no-cache", action="store_true", help="Always convert, ignoring and not updating the conversion cache.")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help=f"Conversion cache location (default: {DEFAULT_CACHE_DIR}).")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES // 1024**2, help="Maximum cache size in MB before old entries are evicted.")
+    parser.add_argument("--store", help="Also add every produced .wcp to this deduplicating blob store (see scripts/blob_store.py).")
+    parser.add_argument("--non-interactive", action="store_true", help="Never prompt: the folder must be given and DXVK-dev versions come from sidecar/mapping files or are derived from the zip.")
+    parser.add_argument("--type", choices=[spec["name"] for spec in components.COMPONENTS], help="Convert every archive with this component's extension through it, whatever its name (e.g. '--type dxvk-dev' for a 'd3d11-async.zip').")
+    parser.add_argument("--dev-metadata", help="JSON file mapping DXVK-dev zip names to {\"versionName\": ..., \"versionCode\": ...}.")
+    parser.add_argument("--watch", action="store_true", help="Keep running and convert new archives as soon as they are fully written to the folder (implies --non-interactive for DXVK-dev metadata).")
+    parser.add_argument("--settle", type=float, default=3.0, help="Watch mode: seconds a file's size and mtime must stay unchanged before it is converted (default: 3).")
+    parser.add_argument("--poll", action="store_true", help="Watch mode: list the folder periodically instead of using inotify (e.g. for Android shared storage).")
+    parser.add_argument("--report", help="Write a structured run report here (.json, or .ndjson/.jsonl for one line per job).")
+    parser.add_argument("--metrics", action="store_true", help="Print per-stage timings for every job.")
+    args = parser.parse_args()
+
     print("--- WCP Batch Converter and Organizer ---")
-    folder_path = input("Enter the full path to the folder containing your archives: ").strip().strip('"')
+    if not args.folder and (args.non_interactive or args.watch): print("\n[ERROR] A folder must be given in non-interactive mode."); sys.exit(2)
+    folder_path = args.folder or input("Enter the full path to the folder containing your archives: ").strip().strip('"')
+    workers = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    try: configure(compression=args.compression or ("low-memory" if args.low_memory else current_settings()["compression"]), reproducible=args.reproducible or current_settings()["reproducible"])
+    except ValueError as e: print(f"\n[ERROR] {e}"); sys.exit(1)
+    # Every zstd worker thread and parallel job holds its own window and buffers.
+    if args.low_memory: workers = 1; configure(threads=0)
 
     if not os.path.isdir(folder_path):
         print(f"\n[ERROR] The path provided is not a valid directory: {folder_path}"); sys.exit(1)
 
+    dev_metadata = None
+    if args.dev_metadata:
+        try:
+            with open(args.dev_metadata, 'r', encoding='utf-8') as f: dev_metadata = json.load(f)
+        except (OSError, json.JSONDecodeError) as e: print(f"[ERROR] Could not read the DXVK-dev metadata file: {e}"); sys.exit(1)
+
+    cache = None if args.no_cache else ConversionCache(args.cache_dir, args.cache_size * 1024**2)
+
+    # Metrics are only collected when something will consume them, keeping normal runs overhead-free.
+    sinks = ([metrics.ConsoleSink()] if args.metrics else []) + ([metrics.sink_for_path(args.report)] if args.report else [])
+    report = metrics.RunReport(sinks) if sinks else None
+    metrics.enable(report is not None)
+
+    if args.watch:
+        try: watch_folder(folder_path, workers, cache, current_settings()["compression"], dev_metadata, args.settle, args.poll, report, args.store, args.type)
+        finally:
+            if report: report.close()
+        return
+
     print(f"\nScanning folder: {folder_path}\n")
 
     try:
         files_in_dir = os.listdir(folder_path)
     except OSError as e:
         print(f"[ERROR] Could not read directory: {e}"); sys.exit(1)
-        
-    processed_count = 0
-    source_files_to_move = []
-    
-    for filename in files_in_dir:
-        full_path, processed = os.path.join(folder_path, filename), False
-        if not os.path.isfile(full_path): continue
 
-        # Dispatch the file to the appropriate converter based on its extension.
-        if filename.endswith(".tar.gz") and convert_dxvk:
-            print("-" * 50); print(f"Found DXVK Release file: {filename}")
-            convert_dxvk(full_path); processed = True
-        elif filename.endswith(".zip") and convert_dxvk_dev:
-            print("-" * 50); print(f"Found DXVK Dev file: {filename}")
-            convert_dxvk_dev(full_path); processed = True
-        elif filename.endswith(".tar.zst") and convert_vkd3d_proton:
-            print("-" * 50); print(f"Found vkd3d-proton file: {filename}")
-            convert_vkd3d_proton(full_path); processed = True
-        
-        if processed:
-            processed_count += 1
-            source_files_to_move.append(full_path)
-            print("-" * 50)
-            
-    if processed_count > 0:
-        print(f"\nBatch processing complete. Processed {processed_count} file(s).")
-        organize_folder(folder_path, source_files_to_move)
+    jobs = resolve_job_metadata(find_jobs(folder_path, files_in_dir, args.type), dev_metadata, interactive=not args.non_interactive)
+    skipped = unmatched_archives(folder_path, files_in_dir, args.type)
+    try: results = run_jobs(jobs, workers, cache, current_settings()["compression"], report)
+    finally:
+        if report:
+            report.close()
+            if args.report: print(f"Run report written to: {args.report}")
+
+    if results:
+        failed = sum(1 for output_path in results.values() if not output_path)
+        print(f"\nBatch processing complete. Processed {len(results)} file(s)" + (f", {failed} failed." if failed else "."))
+        organize_folder(folder_path, list(results))
+        if args.store: store_outputs(args.store, folder_path, results)
     else:
-        print("\nNo compatible files (.tar.gz, .zip, .tar.zst) were found to process.")
+        print(f"\nNo compatible files ({', '.join(dict.fromkeys(spec['extension'] for spec in components.COMPONENTS))}) were found to process.")
+    if skipped: print(f"\nSkipped {len(skipped)} archive(s) not named like any known one (use --type to pick a converter): {', '.join(skipped)}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,28 +1,317 @@
 # Contains shared utility functions for the WCP toolkit.
 
 import os
+import io
+import json
+import mmap
+import time
 import tarfile
+import zipfile
+import tempfile
+from contextlib import contextmanager
 import zstandard as zstd
 
-def create_wcp_archive(source_dir, output_path):
+from . import metrics
+
+# Bump whenever the generated profile.json or archive layout changes, so cached outputs are rebuilt.
+PROFILE_SCHEMA_VERSION = 1
+
+# Named zstd settings for the .wcp stream. 'release' trades encode time for smaller downloads; the
+# window stays at 2^27 (128 MiB), the largest that standard zstd decoders accept without extra flags.
+COMPRESSION_PROFILES = {
+    "fast": {"level": 1},
+    "default": {"level": 3},
+    "release": {"level": 19, "enable_ldm": True, "window_log": 27},
+    # For phones with little RAM: a 1 MiB window keeps both encoding and later decoding in a few MB.
+    "low-memory": {"level": 3, "window_log": 20},
+}
+
+# Settings shared by every archive written in this process. Batch workers lower 'threads'
+# so that parallel jobs and zstd's own threads share one CPU budget (-1 = all cores).
+# 'reproducible' makes identical inputs give byte-identical .wcp files (see normalize_member).
+_settings = {"threads": -1, "compression": os.environ.get("WCP_COMPRESSION", "default"),
+             "reproducible": os.environ.get("WCP_REPRODUCIBLE", "") not in ("", "0")}
+
+# Timestamp of every member in reproducible mode, following the reproducible-builds.org convention.
+REPRODUCIBLE_MTIME = int(os.environ.get("SOURCE_DATE_EPOCH", 0))
+
+# mkstemp creates files readable by their owner only; finished files get the mode open() would have given them.
+_UMASK = os.umask(0o022); os.umask(_UMASK)
+
+def set_default_mode(path):
+    """Gives a file made with tempfile.mkstemp the permissions of a normally created file (0o666 minus the umask)."""
+    os.chmod(path, 0o666 & ~_UMASK)
+
+def configure(**settings):
+    """Updates the process-wide archive settings (e.g. configure(threads=2, compression="release"))."""
+    unknown = set(settings) - set(_settings)
+    if unknown: raise ValueError(f"Unknown archive setting(s): {', '.join(sorted(unknown))}")
+    if "compression" in settings: compression_options(settings["compression"]) # Validate before applying
+    _settings.update(settings)
+
+def current_settings():
+    """Returns a copy of the process-wide archive settings."""
+    return dict(_settings)
+
+def thread_budget(workers):
+    """Splits the CPU cores between parallel workers, returns the zstd thread count for each one."""
+    if workers <= 1: return _settings["threads"] # A single job may use every core, unless --low-memory limited it
+    return max(1, (os.cpu_count() or 1) // workers)
+
+def compression_options(profile):
     """
-    Creates a .tar.zst archive (the .wcp format) from a source directory.
-    This function is shared by all converter scripts.
+    Resolves a profile name ('fast', 'default', 'release') or a custom 'key=value,...' string
+    (e.g. 'level=19,window_log=27,enable_ldm=1') into zstd compression parameter options.
     """
-    print(f"Creating archive at: {output_path}")
-    
-    # Initialize the Zstandard compressor with a good compression level and multi-threading.
-    cctx = zstd.ZstdCompressor(level=3, threads=-1)
+    if profile in COMPRESSION_PROFILES: return dict(COMPRESSION_PROFILES[profile])
+    if "=" not in profile:
+        raise ValueError(f"Unknown compression profile '{profile}'. Use one of {', '.join(COMPRESSION_PROFILES)} or 'key=value,...'.")
+    options = {}
+    for pair in profile.split(","):
+        key, _, value = pair.partition("=")
+        try: options[key.strip()] = int(value)
+        except ValueError: raise ValueError(f"Invalid compression parameter '{pair}', values must be integers.") from None
+    try: zstd.ZstdCompressionParameters.from_level(options.get("level", 3), **{k: v for k, v in options.items() if k != "level"})
+    except TypeError as e: raise ValueError(f"Invalid compression parameters '{profile}': {e}") from None
+    return options
+
+def make_compressor(profile=None, threads=None):
+    """Returns the ZstdCompressor used for .wcp files, defaulting to the configured profile and threads."""
+    options = compression_options(profile or _settings["compression"])
+    level = options.pop("level", 3)
+    threads = _settings["threads"] if threads is None else threads
+    # Multi-threaded zstd output is the same for any worker count, but differs from single-threaded
+    # output (threads=0), so reproducible archives always use the multi-threaded framing.
+    if _settings["reproducible"] and threads == 0: threads = 1
+    return zstd.ZstdCompressor(compression_params=zstd.ZstdCompressionParameters.from_level(level, threads=threads, **options))
+
+@contextmanager
+def open_wcp_writer(output_path):
+    """
+    Opens a streaming .tar.zst writer (the .wcp format) and yields the tarfile object.
+    Members added to it are compressed on the fly straight into output_path.
+    """
+    # Initialize the Zstandard compressor with the configured compression profile and multi-threading.
+    cctx = make_compressor()
 
     # Open the target file in binary write mode to write the compressed data.
     with open(output_path, 'wb') as f_out:
         # Use the Zstandard stream writer to compress data on the fly.
-        with cctx.stream_writer(f_out) as compressor:
+        with cctx.stream_writer(metrics.timed_stream(f_out, "disk_write", "output_bytes_written")) as compressor:
             # Create a streaming tarball writer that sends its output to the compressor.
-            with tarfile.open(mode='w|', fileobj=compressor) as tar:
-                # Iterate over all items in the source directory to be packaged.
-                for item in os.listdir(source_dir):
-                    # Add the item to the tar archive, using its own name as the name inside the archive.
-                    tar.add(os.path.join(source_dir, item), arcname=item)
-                    
-    print("Archive created successfully.")
\ No newline at end of file
+            with tarfile.open(mode='w|', fileobj=metrics.timed_stream(compressor, "encode", "payload_bytes")) as tar:
+                yield tar
+
+def create_wcp_archive(source_dir, output_path):
+    """
+    Creates a .tar.zst archive (the .wcp format) from a source directory.
+    This function is shared by all converter scripts.
+    """
+    print(f"Creating archive at: {output_path}")
+
+    with open_wcp_writer(output_path) as tar:
+        # Iterate over all items in the source directory to be packaged, in a stable order
+        # (tarfile already sorts the contents of every subfolder it recurses into).
+        for item in sorted(os.listdir(source_dir)):
+            # Add the item to the tar archive, using its own name as the name inside the archive.
+            tar.add(os.path.join(source_dir, item), arcname=item, filter=normalize_member)
+
+    print("Archive created successfully.")
+
+def build_profile_files(dlls, member_names, files=None):
+    """
+    Returns the profile.json 'files' entries for every expected DLL present in member_names, followed
+    by the present members of files, a {source: target} map of other files (e.g. {"box64": "${bindir}/box64"}).
+    """
+    entries = [{"source": f"{folder}/{dll}.dll", "target": f"${{{folder}}}/{dll}.dll"}
+               for folder, dll_list in dlls.items() for dll in dll_list
+               if f"{folder}/{dll}.dll" in member_names]
+    return entries + [{"source": source, "target": target} for source, target in (files or {}).items() if source in member_names]
+
+def normalize_member(info):
+    """
+    In reproducible mode, drops the metadata that depends on when and by whom the sources were
+    unpacked: fixed mtime, root ownership without names, and 0o755 / 0o644 permissions.
+    Otherwise returns info unchanged. Also usable as a tarfile.add() filter.
+    """
+    if not _settings["reproducible"]: return info
+    info.mtime, info.uid, info.gid, info.uname, info.gname = REPRODUCIBLE_MTIME, 0, 0, "", ""
+    info.mode = 0o755 if info.isdir() or info.mode & 0o111 else 0o644
+    return info
+
+def add_profile(tar, profile):
+    """Serializes the profile manifest and adds it to the archive as 'profile.json'."""
+    # Reproducible archives sort the keys, so equal manifests serialize the same however they were built.
+    data = json.dumps(profile, indent=4, sort_keys=_settings["reproducible"]).encode('utf-8')
+    info = tarfile.TarInfo("profile.json")
+    info.size, info.mtime, info.mode = len(data), int(time.time()), 0o644
+    tar.addfile(normalize_member(info), io.BytesIO(data))
+
+def read_wcp_profile(wcp_path):
+    """Stream-decodes a .wcp file and returns its parsed profile.json (None if it has none)."""
+    with open(wcp_path, 'rb') as f:
+        with zstd.ZstdDecompressor().stream_reader(f) as reader:
+            with tarfile.open(fileobj=reader, mode='r|') as tar:
+                for member in tar:
+                    if member.isreg() and member.name.lstrip('./') == "profile.json":
+                        return json.load(tar.extractfile(member))
+    return None
+
+def iter_tar_members(tar):
+    """Yields (TarInfo, file object) pairs from a tarfile, including stream ('r|') mode."""
+    for member in tar:
+        yield member, tar.extractfile(member) if member.isreg() else None
+
+def zip_member_info(zip_info):
+    """Builds the TarInfo for a ZipInfo, with the modes a plain extraction would produce (ZipFile ignores stored permissions)."""
+    info = tarfile.TarInfo(zip_info.filename.rstrip('/'))
+    info.mtime = int(time.mktime(zip_info.date_time + (0, 0, -1)))
+    if zip_info.is_dir(): info.type, info.mode = tarfile.DIRTYPE, 0o755
+    else: info.size, info.mode = zip_info.file_size, 0o644
+    return info
+
+def iter_zip_members(zip_ref):
+    """Yields (TarInfo, file object) pairs from a ZipFile, decompressing one member at a time."""
+    for zip_info in zip_ref.infolist():
+        if zip_info.is_dir(): yield zip_member_info(zip_info), None; continue
+        with zip_ref.open(zip_info) as fileobj:
+            yield zip_member_info(zip_info), fileobj
+
+class _MappedFile(mmap.mmap):
+    # ZipFile wants a seekable() method, which mmap objects only gained in Python 3.13.
+    def seekable(self): return True
+
+@contextmanager
+def open_mapped_zip(zip_path):
+    """Opens a zip through a read-only memory map, so members are inflated straight from the page cache."""
+    with open(zip_path, 'rb') as f:
+        with _MappedFile(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with zipfile.ZipFile(mapped, 'r') as zip_ref:
+                yield zip_ref
+
+def _in_root(name, root):
+    # True if name sits under the top-level folder root (always, without a root).
+    return root is None or [p for p in name.split('/') if p not in ('', '.')][:1] == [root]
+
+def is_pe_name(name):
+    """True for the member names of Windows executables (DLLs and EXEs)."""
+    return name.lower().endswith((".dll", ".exe"))
+
+def _rewrite_path(name, arch_map, strip_root):
+    # Maps e.g. 'dxvk-2.3/x64/d3d11.dll' to 'system32/d3d11.dll'.
+    parts = [p for p in name.split('/') if p not in ('', '.')]
+    if strip_root: parts = parts[1:]
+    if parts and parts[0] in arch_map: parts[0] = arch_map[parts[0]]
+    return '/'.join(parts)
+
+def wcp_files(paths):
+    """Yields the .wcp files named by paths, expanding folders into the .wcp files they hold."""
+    for path in paths:
+        if os.path.isdir(path):
+            yield from (os.path.join(path, f) for f in sorted(os.listdir(path)) if f.endswith(".wcp"))
+        else: yield path
+
+@contextmanager
+def open_wcp_part(output_path):
+    """
+    Like open_wcp_writer, but writes to a uniquely named '.wcp.part' file next to output_path that is
+    only renamed to output_path once complete, so an interrupted write never leaves a truncated .wcp.
+    """
+    # Each job writes to its own uniquely named workspace file, so parallel jobs never collide.
+    fd, part_path = tempfile.mkstemp(prefix=".", suffix=".wcp.part", dir=os.path.dirname(output_path) or ".")
+    os.close(fd)
+    try:
+        with open_wcp_writer(part_path) as tar:
+            yield tar
+        set_default_mode(part_path)
+        os.replace(part_path, output_path)
+    finally:
+        # Never leave a truncated archive behind for the organizer to pick up
+        if os.path.exists(part_path): os.remove(part_path)
+
+def _add_member(tar, info, fileobj, written_dirs):
+    # Zip archives may omit directory entries, so emit any missing parents first.
+    parents = info.name.split('/')[:-1]
+    for i in range(1, len(parents) + 1):
+        parent = '/'.join(parents[:i])
+        if parent not in written_dirs:
+            dir_info = tarfile.TarInfo(parent)
+            dir_info.type, dir_info.mode, dir_info.mtime = tarfile.DIRTYPE, 0o755, info.mtime
+            tar.addfile(normalize_member(dir_info)); written_dirs.add(parent)
+    if info.isdir():
+        if info.name in written_dirs: return
+        written_dirs.add(info.name)
+    tar.addfile(normalize_member(info), metrics.timed_stream(fileobj, "decode", "source_bytes_read"))
+    metrics.count("members")
+
+def transcode_to_wcp(members, output_path, arch_map, dlls, profile, strip_root=True, files=None, root=None):
+    """
+    Streams source members straight into a .wcp archive without extracting to disk.
+    Member paths are rewritten through arch_map (e.g. 'x64' -> 'system32'), and the
+    'files' list of profile is built from the rewritten member names that were seen.
+    With a root, only the members under that top-level folder are packaged. DLLs and EXEs that
+    profile.json will not list (e.g. d3d8 in x64) are dropped, as the zip fast path does.
+    """
+    print(f"Creating archive at: {output_path}")
+    wanted = {f"{folder}/{dll}.dll" for folder, dll_list in dlls.items() for dll in dll_list} | set(files or {})
+    seen, renamed, written_dirs, dropped = set(), set(), set(), set()
+
+    with open_wcp_part(output_path) as tar:
+        for info, fileobj in members:
+            if not _in_root(info.name, root): continue
+            original_root = _rewrite_path(info.name, {}, strip_root).split('/')[0]
+            info.name = _rewrite_path(info.name, arch_map, strip_root)
+            if not info.name: continue # The top-level folder itself
+            if original_root in arch_map and original_root not in renamed:
+                renamed.add(original_root); print(f"Renamed '{original_root}' to '{arch_map[original_root]}'.")
+            if info.islnk(): info.linkname = _rewrite_path(info.linkname, arch_map, strip_root)
+            if (is_pe_name(info.name) and info.name not in wanted) or (info.islnk() and info.linkname in dropped):
+                dropped.add(info.name); continue
+            _add_member(tar, info, fileobj, written_dirs)
+            seen.add(info.name)
+        if dropped: print(f"Skipped {len(dropped)} member(s) not listed in profile.json.")
+
+        # Create the profile manifest from the member names that were streamed
+        print("\nGenerating profile.json...")
+        with metrics.stage("manifest"):
+            profile["files"] = build_profile_files(dlls, seen, files)
+            add_profile(tar, profile)
+
+    print("Archive created successfully.")
+
+def transcode_zip_to_wcp(zip_ref, output_path, arch_map, dlls, profile, strip_root=False, files=None, root=None):
+    """
+    Zip fast path: the manifest is worked out from the central directory alone, profile.json is
+    written first, and only the DLLs it lists are inflated into the .wcp. Every other member is
+    skipped without ever being decompressed. With a root, only that top-level folder is looked at.
+    """
+    print(f"Creating archive at: {output_path}")
+    wanted = {f"{folder}/{dll}.dll" for folder, dll_list in dlls.items() for dll in dll_list} | set(files or {})
+    selected = {}
+    for zip_info in zip_ref.infolist():
+        if not _in_root(zip_info.filename, root): continue
+        name = _rewrite_path(zip_info.filename, arch_map, strip_root)
+        if not zip_info.is_dir() and name in wanted: selected.setdefault(name, zip_info)
+    # Checked before anything is written, so an unrelated zip never turns into an empty package.
+    if not selected: raise ValueError(f"The zip holds none of the files to package (e.g. {min(wanted)}).")
+
+    print("Generating profile.json from the zip directory...")
+    with metrics.stage("manifest"):
+        profile["files"] = build_profile_files(dlls, selected, files)
+    for arch, new_name in arch_map.items():
+        if any(name.startswith(f"{new_name}/") for name in selected): print(f"Renamed '{arch}' to '{new_name}'.")
+
+    written_dirs = set()
+    with open_wcp_part(output_path) as tar:
+        add_profile(tar, profile)
+        # Follow the manifest order, so members are written in the order Winlator will install them.
+        for entry in profile["files"]:
+            zip_info = selected[entry["source"]]
+            info = zip_member_info(zip_info)
+            info.name = entry["source"]
+            if entry["source"] in (files or {}): info.mode = 0o755 # Zip artifacts drop the exec bit of binaries like box64
+            with zip_ref.open(zip_info) as fileobj: _add_member(tar, info, fileobj, written_dirs)
+        skipped = sum(1 for zip_info in zip_ref.infolist() if not zip_info.is_dir()) - len(selected)
+        if skipped: print(f"Skipped {skipped} member(s) not listed in profile.json.")
+
+    print("Archive created successfully.")
@@ -0,0 +1,259 @@
+# Benchmarks for the WCP toolkit. Run with: python -m scripts.benchmark <command> --help
+
+import os, io, sys, gzip, json, time, shutil, zipfile, tarfile, argparse, platform, tempfile, subprocess, contextlib, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import zstandard as zstd
+
+from .archive import COMPRESSION_PROFILES, make_compressor, create_wcp_archive, build_profile_files
+from . import components, engine, synthetic_inputs, decoders
+
+try: import resource # Unix only, used for peak RSS
+except ImportError: resource = None
+
+# Synthetic input kind (also its component name) -> generator
+SYNTHETIC_KINDS = {
+    "dxvk": synthetic_inputs.make_dxvk_release,
+    "vkd3d-proton": synthetic_inputs.make_vkd3d_proton_release,
+    "dxvk-dev": synthetic_inputs.make_dxvk_dev_build,
+}
+
+def load_tar_payload(path):
+    """Returns the uncompressed tar bytes of a .wcp, .tar.zst, .tar.gz or plain .tar file."""
+    with open(path, 'rb') as f:
+        if path.endswith((".wcp", ".tar.zst")):
+            with zstd.ZstdDecompressor().stream_reader(f) as reader: return reader.read()
+        if path.endswith(".tar.gz"): return gzip.decompress(f.read())
+        if path.endswith(".tar"): return f.read()
+    raise ValueError(f"Unsupported archive type: {path}")
+
+def _mb_per_s(num_bytes, seconds):
+    return num_bytes / 1024**2 / seconds if seconds > 0 else float("inf")
+
+def bench_compression(payload, profile, threads=-1, repeat=3, chunk_size=1024 * 1024):
+    """Compresses and decompresses payload with a profile, keeping the best of `repeat` runs."""
+    best_compress = best_decompress = float("inf")
+    for _ in range(repeat):
+        # Compress the same way open_wcp_writer does, as a stream without a known content size.
+        buffer = io.BytesIO()
+        start = time.perf_counter()
+        with make_compressor(profile, threads).stream_writer(buffer, closefd=False) as writer:
+            for offset in range(0, len(payload), chunk_size): writer.write(payload[offset:offset + chunk_size])
+        best_compress = min(best_compress, time.perf_counter() - start)
+        compressed = buffer.getvalue()
+
+        # Winlator decodes the stream sequentially on the device, so measure a plain streaming read.
+        start = time.perf_counter()
+        with zstd.ZstdDecompressor().stream_reader(io.BytesIO(compressed)) as reader:
+            while reader.read(chunk_size): pass
+        best_decompress = min(best_decompress, time.perf_counter() - start)
+
+    return {"profile": profile, "input_bytes": len(payload), "output_bytes": len(compressed),
+            "ratio": len(payload) / len(compressed) if compressed else 0.0,
+            "compress_mb_s": _mb_per_s(len(payload), best_compress),
+            "decompress_mb_s": _mb_per_s(len(payload), best_decompress)}
+
+def cmd_compression(args):
+    results = []
+    print(f"{'archive':<40} {'profile':<24} {'ratio':>7} {'comp MB/s':>10} {'decomp MB/s':>12}")
+    for path in args.archives:
+        try: payload = load_tar_payload(path)
+        except (OSError, ValueError, zstd.ZstdError) as e:
+            print(f"[ERROR] Could not read {path}: {e}"); continue
+        for profile in args.profiles:
+            result = {"archive": os.path.basename(path), **bench_compression(payload, profile, args.threads, args.repeat)}
+            results.append(result)
+            print(f"{result['archive'][:40]:<40} {profile[:24]:<24} {result['ratio']:>7.3f} "
+                  f"{result['compress_mb_s']:>10.1f} {result['decompress_mb_s']:>12.1f}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f: json.dump(results, f, indent=4)
+        print(f"\nResults written to {args.json}")
+    return results
+
+# Synthetic sources shaped like real releases: DXVK 2.3 unpacks to ~30 MB of DLLs, vkd3d-proton 2.11 to ~20 MB.
+RELEASE_SHAPES = {
+    "dxvk": {"dll_size": int(2.2 * 1024**2)},
+    "vkd3d-proton": {"dll_size": 5 * 1024**2},
+}
+
+def bench_decode(source_path, codec, backend, repeat=3, chunk_size=1024 * 1024):
+    """Reads the whole decompressed stream of source_path through one backend, keeping the best of `repeat` runs."""
+    best, decoded = float("inf"), 0
+    for _ in range(repeat):
+        decoded = 0
+        start = time.perf_counter()
+        with decoders.open_decoded(codec, source_path, backend) as stream:
+            for chunk in iter(lambda: stream.read(chunk_size), b""): decoded += len(chunk)
+        best = min(best, time.perf_counter() - start)
+    return {"backend": backend, "input_bytes": os.path.getsize(source_path), "decoded_bytes": decoded,
+            "decode_mb_s": _mb_per_s(decoded, best)}
+
+def cmd_decode(args):
+    results = []
+    with tempfile.TemporaryDirectory(prefix="wcp_bench_", dir=args.workdir) as work_dir:
+        sources = list(args.archives)
+        if not sources:
+            for kind, shape in RELEASE_SHAPES.items():
+                print(f"Generating synthetic {kind} release...")
+                sources.append(SYNTHETIC_KINDS[kind](work_dir, seed=args.seed, **shape))
+        print(f"{'archive':<40} {'backend':<10} {'decoded MB':>11} {'MB/s':>9}")
+        for path in sources:
+            codec = next((codec for source_format, codec in decoders.SOURCE_CODECS.items() if path.endswith(source_format)), None)
+            if not codec: print(f"[ERROR] {path} is not a .tar.gz or .tar.zst source."); continue
+            try:
+                for backend in decoders.DECODERS[codec]:
+                    if not decoders.is_available(backend): print(f"{os.path.basename(path)[:40]:<40} {backend:<10} {'(not installed)':>21}"); continue
+                    result = {"archive": os.path.basename(path), "codec": codec, **bench_decode(path, codec, backend, args.repeat)}
+                    results.append(result)
+                    print(f"{result['archive'][:40]:<40} {backend:<10} {result['decoded_bytes'] / 1024**2:>11.1f} {result['decode_mb_s']:>9.1f}")
+            except (OSError, EOFError) as e: print(f"[ERROR] Could not decode {path}: {e}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f: json.dump(results, f, indent=4)
+        print(f"\nResults written to {args.json}")
+    return results
+
+def _io_counters():
+    # Linux-only: 'wchar' counts bytes passed to write calls, 'write_bytes' those sent to the storage layer.
+    try:
+        with open("/proc/self/io", 'r') as f: counters = dict(line.split(": ") for line in f.read().splitlines())
+        return {"wchar": int(counters["wchar"]), "write_bytes": int(counters["write_bytes"])}
+    except (OSError, KeyError, ValueError): return {"wchar": 0, "write_bytes": 0}
+
+class StageTimer:
+    """Records wall time, CPU time and bytes written for each named stage of a pipeline run."""
+
+    def __init__(self): self.stages = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        io_start, wall_start, cpu_start = _io_counters(), time.perf_counter(), time.process_time()
+        try: yield
+        finally:
+            io_end = _io_counters()
+            self.stages[name] = {"wall_s": time.perf_counter() - wall_start, "cpu_s": time.process_time() - cpu_start,
+                                 "bytes_written": io_end["wchar"] - io_start["wchar"],
+                                 "disk_write_bytes": io_end["write_bytes"] - io_start["write_bytes"]}
+
+def _extract(spec, source_path, extract_dir):
+    if spec["format"] == "tar.gz":
+        with tarfile.open(source_path, 'r:gz') as tar: tar.extractall(extract_dir)
+    elif spec["format"] == "tar.zst":
+        with open(source_path, 'rb') as f, zstd.ZstdDecompressor().stream_reader(f) as reader:
+            with tarfile.open(fileobj=reader, mode='r|') as tar: tar.extractall(extract_dir)
+    else:
+        with zipfile.ZipFile(source_path, 'r') as zip_ref: zip_ref.extractall(extract_dir)
+
+def _run_staged(kind, source_path, scratch_dir, timer):
+    # The extract -> rename -> manifest -> compress pipeline, one timed stage per step.
+    spec = components.get(kind)
+    extract_dir = os.path.join(scratch_dir, "extract")
+    with timer.stage("extract"): _extract(spec, source_path, extract_dir)
+    work_dir = os.path.join(extract_dir, os.listdir(extract_dir)[0]) if spec["strip_root"] else extract_dir
+    with timer.stage("rename"):
+        for arch, new_name in spec["arch_map"].items():
+            if os.path.exists(os.path.join(work_dir, arch)): os.rename(os.path.join(work_dir, arch), os.path.join(work_dir, new_name))
+    with timer.stage("manifest"):
+        present = {f"{folder}/{dll}.dll" for folder, dlls in spec["dlls"].items() for dll in dlls
+                   if os.path.exists(os.path.join(work_dir, folder, f"{dll}.dll"))}
+        profile = {"type": "BENCH", "versionName": "bench", "versionCode": 0, "description": "bench", "files": build_profile_files(spec["dlls"], present)}
+        with open(os.path.join(work_dir, "profile.json"), 'w') as f: json.dump(profile, f, indent=4)
+    output_path = os.path.join(scratch_dir, "staged.wcp")
+    with timer.stage("compress"): create_wcp_archive(work_dir, output_path)
+    return output_path
+
+def _run_streaming(kind, source_path, scratch_dir, timer):
+    # The extraction-free engine used by the converters, as a single stage.
+    output_path = os.path.join(scratch_dir, "streaming.wcp")
+    profile = {"type": "BENCH", "versionName": "bench", "versionCode": 0, "description": "bench", "files": []}
+    with timer.stage("transcode"): engine.transcode(components.get(kind), source_path, output_path, profile)
+    return output_path
+
+def _run_case(kind, pipeline, source_path, scratch_dir, compression):
+    """Runs one pipeline in a fresh process, so peak RSS and I/O counters belong to that run alone."""
+    from .archive import configure
+    configure(compression=compression)
+    os.makedirs(scratch_dir, exist_ok=True)
+    timer, wall_start, cpu_start = StageTimer(), time.perf_counter(), time.process_time()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        output_path = (_run_staged if pipeline == "staged" else _run_streaming)(kind, source_path, scratch_dir, timer)
+    result = {"input": kind, "pipeline": pipeline, "stages": timer.stages,
+              "wall_s": time.perf_counter() - wall_start, "cpu_s": time.process_time() - cpu_start,
+              "bytes_written": sum(stage["bytes_written"] for stage in timer.stages.values()),
+              "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+              "input_bytes": os.path.getsize(source_path), "output_bytes": os.path.getsize(output_path)}
+    shutil.rmtree(scratch_dir, ignore_errors=True)
+    return result
+
+def _git_commit():
+    try: return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError): return None
+
+def cmd_stages(args):
+    kinds = args.inputs or list(SYNTHETIC_KINDS)
+    report = {"commit": _git_commit(), "python": platform.python_version(), "platform": platform.platform(),
+              "cpu_count": os.cpu_count(), "zstandard": zstd.__version__,
+              "parameters": {"dll_count": args.dll_count, "dll_size_mb": args.dll_size, "repeat": args.repeat,
+                             "compression": args.compression, "seed": args.seed}, "results": []}
+    context = multiprocessing.get_context("spawn") # A clean interpreter per run keeps peak RSS honest
+
+    with tempfile.TemporaryDirectory(prefix="wcp_bench_", dir=args.workdir) as work_dir:
+        for kind in kinds:
+            generator = SYNTHETIC_KINDS[kind]
+            options = {"dll_size": int(args.dll_size * 1024**2), "seed": args.seed}
+            if args.dll_count: options["dll_count"] = args.dll_count
+            print(f"Generating synthetic {kind} input...")
+            source_path = generator(work_dir, **options)
+
+            for pipeline in args.pipelines:
+                for run in range(args.repeat):
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                        result = pool.submit(_run_case, kind, pipeline, source_path, os.path.join(work_dir, f"run-{kind}-{pipeline}-{run}"), args.compression).result()
+                    result["run"] = run
+                    report["results"].append(result)
+                    stages = ", ".join(f"{name} {stage['wall_s']:.2f}s" for name, stage in result["stages"].items())
+                    print(f"  {pipeline:<9} run {run}: {result['wall_s']:.2f}s wall, {result['cpu_s']:.2f}s CPU, "
+                          f"{(result['peak_rss_kb'] or 0) / 1024:.0f} MB peak RSS, {result['bytes_written'] / 1024**2:.1f} MB written ({stages})")
+
+    with open(args.output, 'w', encoding='utf-8') as f: json.dump(report, f, indent=4)
+    print(f"\nResults written to {args.output}")
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the WCP toolkit.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compression = commands.add_parser("compression", help="Compare compression profiles on existing archives.")
+    compression.add_argument("archives", nargs="+", help=".wcp, .tar.zst, .tar.gz or .tar files to use as input.")
+    compression.add_argument("--profiles", nargs="+", default=list(COMPRESSION_PROFILES), help="Profile names or custom 'key=value,...' parameter strings.")
+    compression.add_argument("--threads", type=int, default=-1, help="zstd compression threads (-1 = all cores, 0 = single-threaded).")
+    compression.add_argument("--repeat", type=int, default=3, help="Runs per measurement, the best one is reported.")
+    compression.add_argument("--json", help="Also write the results to this JSON file.")
+    compression.set_defaults(func=cmd_compression)
+
+    decode = commands.add_parser("decode", help="Compare the decompression backends for .tar.gz / .tar.zst sources.")
+    decode.add_argument("archives", nargs="*", help="Source archives (default: synthetic DXVK and vkd3d-proton releases of real sizes).")
+    decode.add_argument("--repeat", type=int, default=3, help="Runs per measurement, the best one is reported.")
+    decode.add_argument("--seed", type=int, default=0, help="Seed for the synthetic data.")
+    decode.add_argument("--workdir", help="Where to create the scratch directory (default: the system temp folder).")
+    decode.add_argument("--json", help="Also write the results to this JSON file.")
+    decode.set_defaults(func=cmd_decode)
+
+    stages = commands.add_parser("stages", help="Time each converter stage on synthetic DXVK / vkd3d-proton / DXVK-dev inputs.")
+    stages.add_argument("--inputs", nargs="+", choices=list(SYNTHETIC_KINDS), help="Input kinds to generate (default: all).")
+    stages.add_argument("--pipelines", nargs="+", choices=["staged", "streaming"], default=["staged", "streaming"],
+                        help="'staged' extracts to disk, renames, writes the manifest then compresses; 'streaming' is the converters' transcoder.")
+    stages.add_argument("--dll-count", type=int, help="DLLs per architecture folder (default: the real DLL set of each component).")
+    stages.add_argument("--dll-size", type=float, default=4, help="Size of each synthetic DLL in MB (default: 4).")
+    stages.add_argument("--repeat", type=int, default=3, help="Runs per pipeline, each in a fresh process.")
+    stages.add_argument("--compression", default="default", help="Compression profile used for the .wcp output.")
+    stages.add_argument("--seed", type=int, default=0, help="Seed for the synthetic data, keep it fixed to compare commits.")
+    stages.add_argument("--workdir", help="Where to create the scratch directory (default: the system temp folder).")
+    stages.add_argument("--output", default="benchmark_results.json", help="Machine-readable results file (default: benchmark_results.json).")
+    stages.set_defaults(func=cmd_stages)
+
+    args = parser.parse_args(argv)
+    try: args.func(args)
+    except ValueError as e: print(f"[ERROR] {e}"); sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# Local content-addressed store for a .wcp collection. Each package is kept as a manifest
+# (its profile.json plus member hashes) pointing at deduplicated, zstd-compressed blobs.
+# Run with: python -m scripts.blob_store <command> --help
+
+import os, sys, json, hashlib, tarfile, tempfile, argparse
+import zstandard as zstd
+
+from .archive import open_wcp_part, wcp_files
+
+CHUNK_SIZE = 1024 * 1024
+
+class BlobStore:
+    """A directory holding 'blobs/<xx>/<sha256>' files and one 'manifests/<name>.json' per package."""
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.blobs_dir = os.path.join(store_dir, "blobs")
+        self.manifests_dir = os.path.join(store_dir, "manifests")
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        os.makedirs(self.manifests_dir, exist_ok=True)
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blobs_dir, digest[:2], digest)
+
+    def _manifest_path(self, name):
+        return os.path.join(self.manifests_dir, f"{name}.json")
+
+    def _put_blob(self, fileobj):
+        # Hashes and compresses the member in one pass, only keeping the blob if it is new.
+        digest, size = hashlib.sha256(), 0
+        fd, tmp = tempfile.mkstemp(dir=self.blobs_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as raw, zstd.ZstdCompressor(level=3).stream_writer(raw) as writer:
+                for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+                    digest.update(chunk); writer.write(chunk); size += len(chunk)
+            blob_path = self._blob_path(digest.hexdigest())
+            if os.path.exists(blob_path): os.remove(tmp); return digest.hexdigest(), size, False
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            os.replace(tmp, blob_path)
+            return digest.hexdigest(), size, True
+        finally:
+            if os.path.exists(tmp): os.remove(tmp)
+
+    def ingest(self, wcp_path):
+        """Stream-decodes a .wcp into the store, returns (manifest, number of new bytes stored)."""
+        members, profile, new_bytes = [], None, 0
+        with open(wcp_path, 'rb') as f:
+            with zstd.ZstdDecompressor().stream_reader(f) as reader:
+                with tarfile.open(fileobj=reader, mode='r|') as tar:
+                    for info in tar:
+                        entry = {"name": info.name, "type": info.type.decode('ascii'), "mode": info.mode, "mtime": info.mtime}
+                        if info.issym() or info.islnk(): entry["linkname"] = info.linkname
+                        if info.isreg():
+                            entry["sha256"], entry["size"], is_new = self._put_blob(tar.extractfile(info))
+                            if is_new: new_bytes += os.path.getsize(self._blob_path(entry["sha256"]))
+                            if info.name.lstrip('./') == "profile.json":
+                                with self.open_blob(entry["sha256"]) as blob: profile = json.load(blob)
+                        members.append(entry)
+
+        name = os.path.basename(wcp_path)[:-len(".wcp")] if wcp_path.endswith(".wcp") else os.path.basename(wcp_path)
+        manifest = {"name": name, "wcp_size": os.path.getsize(wcp_path), "profile": profile, "members": members}
+        fd, tmp = tempfile.mkstemp(dir=self.manifests_dir, suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f: json.dump(manifest, f, indent=4)
+        os.replace(tmp, self._manifest_path(name))
+        return manifest, new_bytes
+
+    def open_blob(self, digest):
+        """Returns a streaming reader over the uncompressed content of a blob."""
+        return zstd.ZstdDecompressor().stream_reader(open(self._blob_path(digest), 'rb'), closefd=True)
+
+    def manifests(self):
+        """Yields every stored manifest, sorted by package name."""
+        for filename in sorted(os.listdir(self.manifests_dir)):
+            if filename.endswith(".json"):
+                with open(os.path.join(self.manifests_dir, filename), 'r', encoding='utf-8') as f: yield json.load(f)
+
+    def rebuild(self, name, output_path):
+        """Rebuilds a standard .wcp from its manifest, streaming blobs through the shared .wcp writer (via a .part file)."""
+        try:
+            with open(self._manifest_path(name), 'r', encoding='utf-8') as f: manifest = json.load(f)
+        except FileNotFoundError: raise ValueError(f"No package named '{name}' in {self.store_dir}") from None
+
+        with open_wcp_part(output_path) as tar:
+            for entry in manifest["members"]:
+                info = tarfile.TarInfo(entry["name"])
+                info.type, info.mode, info.mtime = entry["type"].encode('ascii'), entry["mode"], entry["mtime"]
+                info.linkname = entry.get("linkname", "")
+                if "sha256" not in entry: tar.addfile(info); continue
+                info.size = entry["size"]
+                with self.open_blob(entry["sha256"]) as blob: tar.addfile(info, blob)
+        return output_path
+
+    def stats(self):
+        """Returns the logical, unique and on-disk sizes of the store along with its dedupe ratios."""
+        packages, logical, wcp_bytes, unique = 0, 0, 0, {}
+        for manifest in self.manifests():
+            packages += 1; wcp_bytes += manifest["wcp_size"]
+            for entry in manifest["members"]:
+                if "sha256" in entry: logical += entry["size"]; unique[entry["sha256"]] = entry["size"]
+        stored = sum(os.path.getsize(self._blob_path(digest)) for digest in unique if os.path.exists(self._blob_path(digest)))
+        unique_bytes = sum(unique.values())
+        return {"packages": packages, "blobs": len(unique), "logical_bytes": logical, "unique_bytes": unique_bytes,
+                "stored_bytes": stored, "wcp_bytes": wcp_bytes,
+                "dedupe_ratio": logical / unique_bytes if unique_bytes else 0.0,
+                "wcp_to_store_ratio": wcp_bytes / stored if stored else 0.0}
+
+def _mb(num_bytes):
+    return f"{num_bytes / 1024**2:.1f} MB"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Deduplicating local store for a .wcp collection.")
+    parser.add_argument("--store", default="_wcp_store", help="Store directory (default: ./_wcp_store).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="Add .wcp files (or folders of them) to the store.")
+    ingest.add_argument("paths", nargs="+")
+    rebuild = commands.add_parser("rebuild", help="Rebuild standard .wcp files from the store.")
+    rebuild.add_argument("names", nargs="+", help="Package names, as shown by 'list'.")
+    rebuild.add_argument("-o", "--output-dir", default=".", help="Where to write the rebuilt .wcp files.")
+    commands.add_parser("list", help="List the stored packages.")
+    commands.add_parser("stats", help="Report the dedupe ratios of the store.")
+    args = parser.parse_args(argv)
+
+    store = BlobStore(args.store)
+    if args.command == "ingest":
+        for wcp_path in wcp_files(args.paths):
+            try:
+                manifest, new_bytes = store.ingest(wcp_path)
+                print(f"Stored {manifest['name']} ({len(manifest['members'])} members, {_mb(new_bytes)} new).")
+            except (OSError, tarfile.TarError, zstd.ZstdError) as e: print(f"[ERROR] Could not ingest {wcp_path}: {e}")
+    elif args.command == "rebuild":
+        os.makedirs(args.output_dir, exist_ok=True)
+        for name in args.names:
+            try: print(f"Rebuilt: {store.rebuild(name, os.path.join(args.output_dir, f'{name}.wcp'))}")
+            except ValueError as e: print(f"[ERROR] {e}"); sys.exit(1)
+    elif args.command == "list":
+        for manifest in store.manifests():
+            profile = manifest["profile"] or {}
+            print(f"{manifest['name']:<50} {profile.get('type', '?'):<8} {profile.get('versionName', '?')}")
+    elif args.command == "stats":
+        stats = store.stats()
+        print(f"Packages: {stats['packages']}, unique blobs: {stats['blobs']}")
+        print(f"Member data: {_mb(stats['logical_bytes'])} logical, {_mb(stats['unique_bytes'])} unique (dedupe ratio {stats['dedupe_ratio']:.2f}x)")
+        print(f"On disk: {_mb(stats['stored_bytes'])} in the store vs {_mb(stats['wcp_bytes'])} as .wcp files ({stats['wcp_to_store_ratio']:.2f}x smaller)")
+
+if __name__ == "__main__":
+    main()
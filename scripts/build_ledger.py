@@ -0,0 +1,94 @@
+# Local ledger of the FEX / Box64 builds triggered in a fork: ref -> source commit -> workflow run -> artifact status.
+# Synced against the fork's workflow runs, so only new or failed refs are triggered again.
+
+import os, re, json, time, tempfile, threading
+from datetime import datetime
+
+DEFAULT_LEDGER_PATH = os.path.join(os.environ.get("WCP_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "wcp_toolkit"), "build_ledger.json")
+TRIGGER_GRACE = 15 * 60 # A trigger without a matching run yet still counts as pending for this many seconds
+
+def _run_time(run):
+    return datetime.fromisoformat(run["created_at"].replace("Z", "+00:00")).timestamp()
+
+class BuildLedger:
+    """
+    The builds of one fork, kept in a JSON file shared by every fork and script. Each ref records its
+    status: 'triggered', 'running', 'success' (with unexpired artifacts) or 'failed'. The merged trees
+    created by the FEX trigger are remembered too, keyed on the ref, base commit and custom build files.
+    """
+
+    def __init__(self, repo_path, path=DEFAULT_LEDGER_PATH):
+        self.repo_path, self.path, self._lock = repo_path, path, threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f: self._data = json.load(f)
+        except (OSError, ValueError): self._data = {}
+        self._repo = self._data.setdefault(repo_path, {"refs": {}, "trees": {}})
+
+    def save(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f: json.dump(self._data, f, indent=4)
+            os.replace(tmp, self.path)
+
+    def entry(self, ref):
+        return self._repo["refs"].get(ref)
+
+    def refs(self):
+        """Returns {ref: entry} for every ref known in this fork."""
+        with self._lock: return dict(self._repo["refs"])
+
+    def record_trigger(self, ref, commit=None, build_commit=None):
+        """Notes that a build of ref (at source commit) was just triggered."""
+        with self._lock:
+            self._repo["refs"][ref] = {"commit": commit, "build_commit": build_commit, "status": "triggered", "triggered_at": time.time(),
+                                       "run_id": None, "conclusion": None, "artifacts": 0}
+        self.save()
+
+    def sync(self, client, workflow, title_pattern, query=""):
+        """
+        Updates every ref from the newest matching workflow run of the fork. Runs are matched to refs
+        through their title (e.g. the 'Build: Prepare FEX tag FEX-2507' commit message).
+        """
+        runs = client.paginate(f"/repos/{self.repo_path}/actions/workflows/{workflow}/runs{query}", key="workflow_runs")
+        latest = {}
+        for run in runs:
+            match = re.search(title_pattern, run.get("display_title") or "")
+            if match and (match.group(1) not in latest or run["created_at"] > latest[match.group(1)]["created_at"]): latest[match.group(1)] = run
+
+        for ref, run in latest.items():
+            entry = self.entry(ref) or {"commit": None, "triggered_at": None}
+            # A newer local trigger whose run has not shown up yet wins over an older run.
+            if entry.get("status") == "triggered" and entry.get("triggered_at") and _run_time(run) < entry["triggered_at"] - 60: continue
+            artifacts = 0
+            if run["status"] != "completed": status = "running"
+            elif run["conclusion"] == "success":
+                artifacts = sum(1 for artifact in client.paginate(f"/repos/{self.repo_path}/actions/runs/{run['id']}/artifacts", key="artifacts") if not artifact.get("expired"))
+                status = "success" if artifacts else "failed" # Expired artifacts have to be rebuilt
+            else: status = "failed"
+            with self._lock:
+                self._repo["refs"][ref] = {**entry, "build_commit": run["head_sha"], "run_id": run["id"], "status": status,
+                                           "conclusion": run.get("conclusion"), "artifacts": artifacts, "synced_at": time.time()}
+        self.save()
+        return latest
+
+    def needs_build(self, ref, commit=None):
+        """True unless ref already has a successful or pending build of the same source commit."""
+        entry = self.entry(ref)
+        if not entry: return True
+        if commit and entry.get("commit") and entry["commit"] != commit: return True # The tag was moved
+        if entry["status"] in ("success", "running"): return False
+        if entry["status"] == "triggered": return time.time() - (entry.get("triggered_at") or 0) > TRIGGER_GRACE
+        return True
+
+    def cached_tree(self, key):
+        """Returns {"tree": sha, "commit": sha} previously created for a merged-tree key (None if unknown)."""
+        return self._repo["trees"].get(key)
+
+    def remember_tree(self, key, tree_sha, commit_sha):
+        with self._lock: self._repo["trees"][key] = {"tree": tree_sha, "commit": commit_sha, "created_at": time.time()}
+        self.save()
+
+    def forget_tree(self, key):
+        with self._lock: self._repo["trees"].pop(key, None)
+        self.save()
@@ -0,0 +1,81 @@
+# Persistent, content-addressed cache of converted .wcp files, so unchanged sources are never re-converted.
+
+import os, json, time, shutil, hashlib, tempfile
+
+from .archive import PROFILE_SCHEMA_VERSION, read_wcp_profile
+
+DEFAULT_CACHE_DIR = os.environ.get("WCP_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "wcp_toolkit")
+DEFAULT_MAX_BYTES = 2 * 1024**3 # 2 GiB
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """Returns the SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""): digest.update(chunk)
+    return digest.hexdigest()
+
+def cache_key(source_path, converter, **extra):
+    """Builds the cache key from the source content hash, the converter (component name) and the profile-schema version."""
+    # The file name is part of the key too, since converters derive the version and output name from it.
+    material = {"source": file_digest(source_path), "name": os.path.basename(source_path),
+                "converter": converter, "schema": PROFILE_SCHEMA_VERSION, **extra}
+    return hashlib.sha256(json.dumps(material, sort_keys=True).encode('utf-8')).hexdigest()
+
+def _link_or_copy(src, dst):
+    # Hardlinks when possible (same filesystem), otherwise falls back to a real copy.
+    tmp = f"{dst}.{os.getpid()}.tmp"
+    try:
+        try: os.link(src, tmp)
+        except OSError: shutil.copy2(src, tmp)
+        os.replace(tmp, dst)
+    finally:
+        if os.path.exists(tmp): os.remove(tmp)
+
+class ConversionCache:
+    """Maps cache keys to previously produced .wcp files (and their profile.json), evicting by size/LRU."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir, self.max_bytes = cache_dir, max_bytes
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        self.index_path = os.path.join(cache_dir, "index.json")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f: self.index = json.load(f)
+        except (OSError, json.JSONDecodeError): self.index = {}
+
+    def _object_path(self, key):
+        return os.path.join(self.objects_dir, f"{key}.wcp")
+
+    def _save(self):
+        # Write the index atomically so an interrupted run never corrupts it.
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f: json.dump(self.index, f, indent=4)
+        os.replace(tmp, self.index_path)
+
+    def lookup(self, key, dest_dir):
+        """On a hit, links or copies the cached .wcp into dest_dir and returns its path, otherwise None."""
+        entry = self.index.get(key)
+        if entry is None: return None
+        if not os.path.exists(self._object_path(key)):
+            del self.index[key]; self._save(); return None
+
+        output_path = os.path.join(dest_dir, entry["output_name"])
+        _link_or_copy(self._object_path(key), output_path)
+        entry["last_used"] = time.time(); self._save()
+        return output_path
+
+    def store(self, key, output_path):
+        """Adds a freshly converted .wcp to the cache, then evicts old entries if over the size limit."""
+        _link_or_copy(output_path, self._object_path(key))
+        self.index[key] = {"output_name": os.path.basename(output_path), "size": os.path.getsize(output_path),
+                           "profile": read_wcp_profile(output_path), "last_used": time.time()}
+        self.evict()
+        self._save()
+
+    def evict(self):
+        """Removes the least recently used entries until the cache fits in max_bytes."""
+        total = sum(entry["size"] for entry in self.index.values())
+        for key, entry in sorted(self.index.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes: break
+            if os.path.exists(self._object_path(key)): os.remove(self._object_path(key))
+            total -= entry["size"]; del self.index[key]
@@ -0,0 +1,123 @@
+# Machine-readable catalog of a .wcp collection (catalog.json next to the packages), kept up to date
+# incrementally: a package is only decoded again when its size or mtime changed.
+# Run with: python -m scripts.catalog <command> --help
+
+import os, re, sys, json, tempfile, argparse
+
+from .archive import read_wcp_profile, set_default_mode
+from .cache import file_digest
+
+CATALOG_NAME = "catalog.json"
+CATALOG_SCHEMA_VERSION = 1
+
+def is_dev_build(entry):
+    """True for DXVK-dev builds, which carry their build date (YYYYMMDD) as versionCode; releases use small codes."""
+    return 19700101 <= (entry.get("versionCode") or 0) <= 99991231
+
+def version_key(version_name):
+    """Sort key comparing the numbers in a version name numerically ('2.10' after '2.9')."""
+    return [(0, int(part), "") if part.isdigit() else (1, 0, part) for part in re.findall(r'\d+|[a-z]+', str(version_name).lower())]
+
+def index_package(wcp_path):
+    """Decodes one .wcp and returns its catalog entry."""
+    stat = os.stat(wcp_path)
+    profile = read_wcp_profile(wcp_path) or {}
+    files = [entry.get("target") or entry.get("source") for entry in profile.get("files") or []]
+    return {"type": profile.get("type"), "versionName": profile.get("versionName"), "versionCode": profile.get("versionCode"),
+            "description": profile.get("description"), "size": stat.st_size, "mtime": stat.st_mtime, "sha256": file_digest(wcp_path),
+            "files": files, "dlls": sorted({os.path.basename(f).lower()[:-len(".dll")] for f in files if f and f.lower().endswith(".dll")})}
+
+class Catalog:
+    """The catalog of the .wcp files in one folder, as {file name: entry}."""
+
+    def __init__(self, folder):
+        self.folder, self.path = folder, os.path.join(folder, CATALOG_NAME)
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f: data = json.load(f)
+        except (OSError, ValueError): data = {}
+        # Entries written by another schema are simply rebuilt.
+        self.packages = data.get("packages", {}) if data.get("schema") == CATALOG_SCHEMA_VERSION else {}
+
+    def save(self):
+        # Written atomically, so mirrors polling the file never read a half-written catalog.
+        fd, tmp = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f: json.dump({"schema": CATALOG_SCHEMA_VERSION, "packages": self.packages}, f, indent=4, sort_keys=True)
+        set_default_mode(tmp)
+        os.replace(tmp, self.path)
+
+    def _refresh(self, filename):
+        # Returns True if the entry had to be (re)built.
+        wcp_path = os.path.join(self.folder, filename)
+        stat, entry = os.stat(wcp_path), self.packages.get(filename)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime: return False
+        self.packages[filename] = index_package(wcp_path)
+        return True
+
+    def add(self, wcp_path):
+        """Indexes (or re-indexes) one package of the folder and saves the catalog."""
+        try: self._refresh(os.path.basename(wcp_path))
+        except Exception as e: print(f"[WARN] Could not index '{os.path.basename(wcp_path)}': {e}"); return
+        self.save()
+
+    def update(self):
+        """Re-indexes changed packages, drops removed ones and saves, returns (indexed, unchanged, removed) counts."""
+        present = {f for f in os.listdir(self.folder) if f.endswith(".wcp")}
+        removed = [f for f in self.packages if f not in present]
+        for filename in removed: del self.packages[filename]
+        indexed = 0
+        for filename in sorted(present):
+            try: indexed += self._refresh(filename)
+            except Exception as e: print(f"[WARN] Could not index '{filename}': {e}"); self.packages.pop(filename, None)
+        self.save()
+        return indexed, len(present) - indexed, len(removed)
+
+    def query(self, profile_type=None, match=None, dll=None, latest=False):
+        """
+        Returns [(file name, entry)] filtered by profile type, a case-insensitive text found in the file
+        name, versionName or description, and a DLL name: releases newest version first, then dev builds
+        newest first. latest keeps only the newest one, so a dev build only when no release matches.
+        """
+        results = []
+        for filename, entry in self.packages.items():
+            if profile_type and (entry.get("type") or "").lower() != profile_type.lower(): continue
+            text = " ".join(str(value) for value in (filename, entry.get("versionName"), entry.get("description")) if value).lower()
+            if match and match.lower() not in text: continue
+            if dll and dll.lower().removesuffix(".dll") not in entry.get("dlls", []): continue
+            results.append((filename, entry))
+        # A dev build's date code would outrank every release's, so the two are only compared among themselves.
+        def sort_key(item):
+            entry = item[1]
+            if is_dev_build(entry): return (0, entry["versionCode"], version_key(entry.get("versionName")))
+            return (1, version_key(entry.get("versionName")), entry.get("versionCode") or 0)
+        results.sort(key=sort_key, reverse=True)
+        return results[:1] if latest else results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain and query the catalog.json of a .wcp folder.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    update = commands.add_parser("update", help="Index new or changed packages and drop removed ones.")
+    update.add_argument("folder", nargs="?", default="_wcp_output", help="Folder of .wcp files (default: ./_wcp_output).")
+    query = commands.add_parser("query", help="List packages from the catalog, without opening any archive.")
+    query.add_argument("folder", nargs="?", default="_wcp_output")
+    query.add_argument("--type", help="profile.json type, e.g. DXVK, VKD3D, FEXCore or Box64.")
+    query.add_argument("--match", help="Text in the file name, version or description, e.g. gplasync.")
+    query.add_argument("--dll", help="Only packages installing this DLL, e.g. d3d8.")
+    query.add_argument("--latest", action="store_true", help="Only the newest matching package.")
+    query.add_argument("--json", action="store_true", help="Print the matching entries as JSON.")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.folder): print(f"[ERROR] Not a directory: {args.folder}"); sys.exit(1)
+    catalog = Catalog(args.folder)
+    if args.command == "update":
+        indexed, unchanged, removed = catalog.update()
+        print(f"Catalog updated: {indexed} indexed, {unchanged} unchanged, {removed} removed ({catalog.path}).")
+        return
+
+    results = catalog.query(args.type, args.match, args.dll, args.latest)
+    if args.json: print(json.dumps(dict(results), indent=4)); return
+    for filename, entry in results:
+        print(f"{filename:<45} {entry['type'] or '?':<8} {entry['versionName'] or '?':<24} {entry['size']:>12,}  {', '.join(entry['dlls'])}")
+    if not results: print("No matching packages."); sys.exit(1)
+
+if __name__ == "__main__":
+    main()
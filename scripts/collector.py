@@ -0,0 +1,235 @@
+# Collects the FEX / Box64 builds triggered in a fork: polls their workflow runs and packages each finished
+# artifact into a .wcp while it downloads. Artifacts are read with HTTP range requests, so only the central
+# directory and the members listed in profile.json are fetched, and the zip never lands on disk.
+# Run with: python -m scripts.collector <your user>/<your fork> --component fex
+
+import io, os, re, sys, json, time, random, zipfile, argparse, http.client
+from urllib.parse import urlsplit
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from . import components, engine
+from .archive import configure, thread_budget, COMPRESSION_PROFILES
+from .build_ledger import BuildLedger, TRIGGER_GRACE
+from .github_api import GitHubClient, GitHubError
+
+BLOCK_SIZE = 1024 * 1024 # Bytes fetched per range request
+MAX_RETRIES = 5
+RUN_ATTEMPTS = 3 # Polls that may retry a run whose artifacts failed to download
+PROFILE_PATTERN = re.compile(r'^[^/]+_WCP/profile\.json$') # The profile.json staged by the workflow
+
+def _load_profile_metadata(zip_ref, source, root=None):
+    for name in zip_ref.namelist():
+        if (name == f"{root}/profile.json") if root else PROFILE_PATTERN.match(name):
+            entry = json.loads(zip_ref.read(name))
+            try: return str(entry["versionName"]), int(entry["versionCode"])
+            except (KeyError, TypeError, ValueError): raise ValueError(f"{name} in {source} needs a 'versionName' and a numeric 'versionCode'.") from None
+    raise ValueError(f"{source} has no '<name>_WCP/profile.json', is it a FEXCore or Box64 artifact?")
+
+def resolve_metadata(zip_path, mapping=None, interactive=True):
+    """Returns (version name, version code) of a downloaded CI artifact, as the workflow wrote them in its staged profile.json."""
+    if mapping and os.path.basename(zip_path) in mapping:
+        entry = mapping[os.path.basename(zip_path)]
+        try: return str(entry["versionName"]), int(entry["versionCode"])
+        except (KeyError, TypeError, ValueError): raise ValueError(f"The mapping entry for {os.path.basename(zip_path)} needs a 'versionName' and a numeric 'versionCode'.") from None
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref: return _load_profile_metadata(zip_ref, os.path.basename(zip_path))
+
+class RemoteFile(io.RawIOBase):
+    """
+    A seekable, read-only view of a file on an HTTP server that honours Range requests, fetched one
+    block at a time over a keep-alive connection. A transfer cut off midway resumes from the last byte
+    received, and resolve_url() is called again for a fresh URL once a signed download link expires.
+    """
+
+    def __init__(self, resolve_url, size=None, block_size=BLOCK_SIZE, max_retries=MAX_RETRIES):
+        self._resolve_url, self.block_size, self.max_retries = resolve_url, block_size, max_retries
+        self._url, self._connection, self._origin = resolve_url(), None, None
+        self._pos, self._block_start, self._block = 0, 0, b""
+        self.stats = {"requests": 0, "resumes": 0, "bytes": 0}
+        self.size = size if size is not None else self._probe_size()
+
+    def _connect(self, parts):
+        origin = (parts.scheme, parts.netloc)
+        if self._connection is None or self._origin != origin:
+            self._close_connection()
+            connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+            self._connection, self._origin = connection_class(parts.netloc, timeout=60), origin
+        return self._connection
+
+    def _close_connection(self):
+        if self._connection: self._connection.close()
+        self._connection = None
+
+    def _fetch(self, start, end):
+        # Returns bytes [start, end), retrying and resuming after dropped connections and expired URLs.
+        received, attempt = bytearray(), 0
+        while True:
+            offset = start + len(received)
+            parts = urlsplit(self._url)
+            try:
+                connection = self._connect(parts)
+                connection.request("GET", parts.path + (f"?{parts.query}" if parts.query else ""), headers={"Range": f"bytes={offset}-{end - 1}", "User-Agent": "Winlator-WCP-Toolkit"})
+                response = connection.getresponse()
+                self.stats["requests"] += 1
+                if response.status == 206: received += response.read(end - offset) # May raise IncompleteRead
+                elif response.status == 200:
+                    # The server ignored the range: skip to the offset in the full body.
+                    body = response.read(end)
+                    self._close_connection(); received += body[offset:end]
+                elif response.status in (401, 403, 404, 410):
+                    # Signed artifact links only live for a minute or so.
+                    response.read(); self._url = self._resolve_url()
+                    raise OSError(f"HTTP {response.status}, download link renewed")
+                else: response.read(); raise OSError(f"HTTP {response.status} for bytes {offset}-{end - 1}")
+                if len(received) < end - start: raise OSError(f"short read at byte {start + len(received)}")
+                self.stats["bytes"] += len(received)
+                return bytes(received)
+            except (OSError, http.client.HTTPException) as e:
+                if isinstance(e, http.client.IncompleteRead): received += e.partial
+                self._close_connection()
+                if attempt >= self.max_retries: raise OSError(f"Download failed after {attempt + 1} attempts: {e}") from e
+                attempt += 1; self.stats["resumes"] += 1
+                time.sleep(min(30.0, 2 ** (attempt - 1)) + random.uniform(0, 1))
+
+    def _probe_size(self):
+        parts = urlsplit(self._url)
+        connection = self._connect(parts)
+        connection.request("GET", parts.path + (f"?{parts.query}" if parts.query else ""), headers={"Range": "bytes=0-0", "User-Agent": "Winlator-WCP-Toolkit"})
+        response = connection.getresponse(); response.read()
+        match = re.search(r'/(\d+)$', response.getheader("Content-Range") or "")
+        if response.status != 206 or not match: raise OSError(f"The server does not support range requests (HTTP {response.status})")
+        return int(match.group(1))
+
+    def readable(self): return True
+    def seekable(self): return True
+    def tell(self): return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR: offset += self._pos
+        elif whence == io.SEEK_END: offset += self.size
+        if offset < 0: raise ValueError("negative seek position")
+        self._pos = offset
+        return self._pos
+
+    def readinto(self, buffer):
+        # Fills the whole buffer (short only at EOF): ZipFile takes a short read for a truncated file.
+        buffer, filled = memoryview(buffer).cast('B'), 0
+        while filled < len(buffer) and self._pos < self.size:
+            if not self._block_start <= self._pos < self._block_start + len(self._block):
+                end = min(self.size, self._pos + max(self.block_size, len(buffer) - filled))
+                self._block_start, self._block = self._pos, self._fetch(self._pos, end)
+            offset = self._pos - self._block_start
+            data = memoryview(self._block)[offset:offset + len(buffer) - filled]
+            buffer[filled:filled + len(data)] = data
+            filled += len(data); self._pos += len(data)
+        return filled
+
+    def close(self):
+        self._close_connection()
+        super().close()
+
+def _pending(entry):
+    # A run that may still produce an artifact: running, or triggered too recently to have shown up.
+    if entry["status"] == "running": return True
+    return entry["status"] == "triggered" and time.time() - (entry.get("triggered_at") or 0) <= TRIGGER_GRACE
+
+def _known_output_path(spec, name, output_dir):
+    # The .wcp path when the spec names it after the artifact alone (None if it needs the version from profile.json).
+    try: return os.path.join(output_dir, spec["output"].format(stem=name))
+    except KeyError: return None
+
+def collect_artifact(client, spec, repo_path, artifact, output_dir):
+    """
+    Streams one artifact into a .wcp in output_dir. Returns (.wcp path, True) when it was created now,
+    (.wcp path, False) when it was already collected, and (None, False) on failure.
+    """
+    def download_url():
+        status, headers, _ = client.request("GET", f"/repos/{repo_path}/actions/artifacts/{artifact['id']}/zip", use_cache=False)
+        if status not in (301, 302, 303, 307, 308) or not headers.get("location"): raise OSError(f"No download link for artifact {artifact['name']} (HTTP {status})")
+        return headers["location"]
+
+    name = artifact["name"]
+    # Checked before any download, so collecting again costs no range requests for what is already there.
+    output_path = _known_output_path(spec, name, output_dir)
+    if output_path and os.path.exists(output_path): print(f"Skipping {name}, {os.path.basename(output_path)} is already collected."); return output_path, False
+    try:
+        with RemoteFile(download_url, artifact.get("size_in_bytes")) as remote, zipfile.ZipFile(remote, 'r') as zip_ref:
+            version_name, version_code = _load_profile_metadata(zip_ref, name, spec.get("root"))
+            output_path = os.path.join(output_dir, engine.output_name(spec, name, version_name, version_code))
+            if os.path.exists(output_path): print(f"Skipping {name}, {os.path.basename(output_path)} is already collected."); return output_path, False
+            print(f"Streaming {name} ({spec['display']} {version_name})...")
+            engine.transcode_zip(spec, zip_ref, output_path, engine.new_profile(spec, version_name, version_code))
+        print(f"--- Collected {name}: {output_path} ({remote.stats['requests']} request(s), {remote.stats['bytes'] / 1e6:.1f} MB read of {remote.size / 1e6:.1f} MB) ---")
+        return output_path, True
+    except (OSError, ValueError, GitHubError, zipfile.BadZipFile) as e: print(f"[ERROR] Could not collect {name}: {e}")
+    return None, False
+
+def collect(client, spec, repo_path, output_dir, refs=None, jobs=4, interval=60.0, timeout=None, wait=True):
+    """
+    Polls the fork's workflow runs for spec's component (through the build ledger) and collects every
+    finished artifact that has no .wcp in output_dir yet, up to `jobs` at once. Keeps polling while
+    runs are pending (unless wait is False), and returns the list of created .wcp paths.
+    """
+    ledger, created, done, unknown, attempts = BuildLedger(repo_path), [], set(), set(), Counter()
+    deadline = time.monotonic() + timeout if timeout else None
+    os.makedirs(output_dir, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while True:
+            ledger.sync(client, spec["workflow"], spec["run_title"], spec.get("run_query", ""))
+            entries = {ref: entry for ref, entry in ledger.refs().items() if not refs or ref in refs}
+            futures, failed = {}, set() # {run id: futures of its artifacts}, runs to retry
+            for ref, entry in sorted(entries.items()):
+                if entry["status"] != "success" or entry["run_id"] in done: continue
+                attempts[entry["run_id"]] += 1
+                try: artifacts = client.paginate(f"/repos/{repo_path}/actions/runs/{entry['run_id']}/artifacts", key="artifacts")
+                except GitHubError as e:
+                    print(f"[ERROR] Could not list the artifacts of {ref}: {e}")
+                    if attempts[entry["run_id"]] < RUN_ATTEMPTS: failed.add(entry["run_id"])
+                    else: done.add(entry["run_id"])
+                    continue
+                futures[entry["run_id"]] = [pool.submit(collect_artifact, client, spec, repo_path, artifact, output_dir) for artifact in artifacts if not artifact.get("expired")]
+            for run_id, run_futures in futures.items():
+                results = [future.result() for future in run_futures]
+                created.extend(path for path, fresh in results if fresh)
+                # A run is only done once all its artifacts are collected, failed ones are retried on the next poll.
+                if all(path for path, _ in results): done.add(run_id)
+                elif attempts[run_id] < RUN_ATTEMPTS: failed.add(run_id)
+                else: done.add(run_id); print(f"[ERROR] Giving up on run {run_id} after {RUN_ATTEMPTS} attempts.")
+
+            for ref in sorted(set(refs or ()) - set(entries) - unknown): print(f"[WARN] No build of {ref} was found in {repo_path}."); unknown.add(ref)
+            pending = sorted(ref for ref, entry in entries.items() if _pending(entry))
+            retry = sorted(ref for ref, entry in entries.items() if entry.get("run_id") in failed)
+            if not wait or not (pending or retry): break
+            if deadline and time.monotonic() + interval > deadline: print(f"[WARN] Gave up waiting for: {', '.join(pending + retry)}"); break
+            print(f"Waiting for {len(pending + retry)} build(s) ({', '.join(pending + retry)}), checking again in {interval:.0f}s...")
+            time.sleep(interval)
+    return created
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download the finished FEXCore / Box64 builds of your fork and package them into .wcp files.")
+    parser.add_argument("repo", help="Your fork, as <user>/<repository> (e.g. me/FEX).")
+    parser.add_argument("--component", required=True, choices=[spec["name"] for spec in components.COMPONENTS if "workflow" in spec])
+    parser.add_argument("--ref", action="append", dest="refs", help="Only collect this tag or build name (repeatable). Default: every build in the fork.")
+    parser.add_argument("-o", "--output", default="_wcp_output", help="Folder for the .wcp files (default: ./_wcp_output).")
+    parser.add_argument("-j", "--jobs", type=int, default=4, help="Artifacts downloaded at once (default: 4).")
+    parser.add_argument("--interval", type=float, default=60.0, help="Seconds between checks of running builds (default: 60).")
+    parser.add_argument("--timeout", type=float, help="Stop waiting for running builds after this many seconds.")
+    parser.add_argument("--no-wait", action="store_true", help="Collect what is finished now and exit, without waiting for running builds.")
+    parser.add_argument("--compression", default=None, help=f"Zstandard profile ({', '.join(COMPRESSION_PROFILES)}) or 'key=value,...' parameters.")
+    parser.add_argument("--reproducible", action="store_true", help="Write byte-identical .wcp files for identical artifacts.")
+    args = parser.parse_args(argv)
+
+    if args.compression:
+        try: configure(compression=args.compression)
+        except ValueError as e: parser.error(str(e))
+    if args.reproducible: configure(reproducible=True)
+    # The jobs share one process, so they split the cores instead of each compressing on all of them.
+    configure(threads=thread_budget(args.jobs))
+    client = GitHubClient()
+    try: created = collect(client, components.get(args.component), args.repo, args.output, args.refs, args.jobs, args.interval, args.timeout, not args.no_wait)
+    except GitHubError as e: print(f"[FATAL ERROR] Could not read the workflow runs of {args.repo}: {e}"); sys.exit(1)
+    finally: client.close()
+    print(f"\nCollected {len(created)} package(s) into {args.output}.")
+
+if __name__ == "__main__":
+    main()
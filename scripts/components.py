@@ -0,0 +1,81 @@
+# Declarative registry of the components the toolkit converts into .wcp packages.
+# A spec is plain data; its version parser is referenced by name ('module:function') and only
+# imported once a matching file shows up, so matching files never loads a converter or zstandard.
+
+import re, importlib
+
+# Fields of a spec:
+#   name         registry key, also part of the conversion cache key
+#   label        shown in the batch converter's output
+#   extension    source archive suffix used for matching, and format how it is read ('tar.gz', 'tar.zst' or 'zip')
+#   arch_map     source folder -> Winlator folder, and dlls the DLLs listed in profile.json per Winlator folder
+#   strip_root   whether the members sit under a top-level folder that must be dropped
+#   type         profile.json 'type'; display and description (with '{version}') name the version in messages and the profile
+#   output       .wcp file name, formatted with {stem} (source name without extension), {version} and {code}
+#   version      'module:function' parsing the version name from the file name (version code 0), or
+#   metadata     'module:function(path, mapping, interactive)' returning (version name, version code)
+# Optional fields:
+#   files        {source: target} of non-DLL members to install, e.g. {"box64": "${bindir}/box64"}
+#   pattern      regex the file name must match (case-insensitive) besides the extension, for generic ones like '.zip'
+#   root         with strip_root, the only top-level folder whose members are packaged (default: any)
+#   machines     {Winlator folder: allowed PE machines}, checked by scripts/verify.py (default: x64 / i386)
+#   workflow     GitHub Actions workflow building the component in a fork; run_title is the regex whose group
+#                is the ref in the run titles and run_query filters the runs. Used by scripts/collector.py.
+DXVK_DLLS = {"system32": ["d3d9", "d3d10", "d3d10_1", "d3d10core", "d3d11", "dxgi"], "syswow64": ["d3d8", "d3d9", "d3d10", "d3d10_1", "d3d10core", "d3d11", "dxgi"]}
+
+COMPONENTS = [
+    {"name": "dxvk", "label": "DXVK Release", "extension": ".tar.gz", "format": "tar.gz",
+     "arch_map": {"x32": "syswow64", "x64": "system32"}, "dlls": DXVK_DLLS, "strip_root": True,
+     "type": "DXVK", "display": "DXVK", "description": "DXVK-{version}", "output": "{stem}.wcp",
+     "version": "scripts.dxvk_to_wcp:extract_version_from_filename"},
+    {"name": "dxvk-dev", "label": "DXVK Dev", "extension": ".zip", "format": "zip", "pattern": r"^dxvk[-_.]", # e.g. 'dxvk-master.zip'
+     "arch_map": {"x32": "syswow64", "x64": "system32"}, "dlls": DXVK_DLLS, "strip_root": False, # ZIPs often store the files directly without a subfolder
+     "type": "DXVK", "display": "DXVK-dev", "description": "DXVK-{version}", "output": "dxvk-{version}-{code}.wcp",
+     "metadata": "scripts.dxvk_dev_to_wcp:resolve_metadata"},
+    {"name": "vkd3d-proton", "label": "vkd3d-proton", "extension": ".tar.zst", "format": "tar.zst",
+     "arch_map": {"x86": "syswow64", "x64": "system32"}, "dlls": {"system32": ["d3d12", "d3d12core"], "syswow64": ["d3d12", "d3d12core"]},
+     "strip_root": True, "type": "VKD3D", "display": "vkd3d-proton", "description": "vkd3d-proton-{version}", "output": "{stem}.wcp",
+     "version": "scripts.vkd3d_proton_to_wcp:extract_version_from_filename"},
+    # The CI artifacts also hold the loose binaries, a ready .wcp and maybe other folders; only the '<name>_WCP' staging folder is packaged.
+    {"name": "fex", "label": "FEXCore Artifact", "extension": ".zip", "format": "zip",
+     "arch_map": {}, "dlls": {"system32": ["libarm64ecfex", "libwow64fex"]}, "strip_root": True, "root": "FEXCore_WCP",
+     "machines": {"system32": ["arm64", "x64"]}, # libwow64fex is ARM64, ARM64EC DLLs declare x64
+     "type": "FEXCore", "display": "FEXCore", "description": "FEXCore {version}", "output": "{stem}.wcp",
+     "metadata": "scripts.collector:resolve_metadata",
+     "workflow": "Compile-FEXCore.yml", "run_title": r"Build: Prepare FEX tag (\S+)", "run_query": "?branch=ci-test"},
+    {"name": "box64", "label": "Box64 Artifact", "extension": ".zip", "format": "zip",
+     "arch_map": {}, "dlls": {}, "files": {"box64": "${bindir}/box64"}, "strip_root": True, "root": "Box64_WCP",
+     "type": "Box64", "display": "Box64", "description": "Box64 {version}", "output": "{stem}.wcp",
+     "metadata": "scripts.collector:resolve_metadata",
+     "workflow": "Compile-Box64.yml", "run_title": r"Build Box64 (\S+)", "run_query": "?event=workflow_dispatch"},
+]
+
+_BY_NAME = {spec["name"]: spec for spec in COMPONENTS}
+
+def get(name):
+    """Returns the spec registered under name."""
+    try: return _BY_NAME[name]
+    except KeyError: raise ValueError(f"Unknown component '{name}'. Known components: {', '.join(_BY_NAME)}") from None
+
+def match(filename, name=None):
+    """
+    Returns the spec whose source extension (and name pattern) filename matches (None if no component handles it).
+    With name, only that component is considered and its name pattern is not required.
+    """
+    if name:
+        spec = get(name)
+        return spec if filename.endswith(spec["extension"]) else None
+    for spec in COMPONENTS:
+        # CI artifacts are zips like DXVK dev builds, so their specs are only ever picked by name.
+        if "workflow" in spec or not filename.endswith(spec["extension"]): continue
+        if "pattern" not in spec or re.search(spec["pattern"], filename, re.IGNORECASE): return spec
+    return None
+
+def is_archive_name(filename):
+    """True if filename has the extension of some component, whether or not its name matches one."""
+    return filename.endswith(tuple(spec["extension"] for spec in COMPONENTS))
+
+def load(reference):
+    """Imports and returns the function named by a 'module:function' reference."""
+    module_name, _, function_name = reference.partition(":")
+    return getattr(importlib.import_module(module_name), function_name)
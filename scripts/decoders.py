@@ -0,0 +1,77 @@
+# Decompression backends for source archives. Each codec has backends in order of preference; the
+# first one available is used, and the standard library (or zstandard, already required) always is.
+# Set WCP_GZIP_DECODER / WCP_ZSTD_DECODER to force one, e.g. WCP_GZIP_DECODER=stdlib.
+
+import os, gzip, shutil, tempfile, subprocess, importlib.util
+from contextlib import contextmanager
+import zstandard as zstd
+
+READ_SIZE = 1024 * 1024 # Compressed bytes fed to a decoder per call; also the tarfile read buffer
+TAR_BUFSIZE = READ_SIZE
+
+# Codec -> backends, fastest first:
+#   isal       python-isal (ISA-L igzip), decoding on its own thread outside the GIL
+#   zlib-ng    python-zlib-ng, decoding on its own thread outside the GIL
+#   pigz       'pigz -dc' in a separate process; gzip streams cannot be split, but pigz reads,
+#              inflates and checks the CRC on separate threads, parallel with our tar parsing
+#   stdlib     gzip module (zlib) on the calling thread
+#   zstandard  zstandard stream reader with a large read size
+#   zstd-cli   'zstd -dc' in a separate process, parallel with our tar parsing
+DECODERS = {"gzip": ["isal", "zlib-ng", "pigz", "stdlib"], "zstd": ["zstandard", "zstd-cli"]}
+SOURCE_CODECS = {"tar.gz": "gzip", "tar.zst": "zstd"}
+
+_MODULES = {"isal": "isal", "zlib-ng": "zlib_ng"}
+_COMMANDS = {"pigz": "pigz", "zstd-cli": "zstd"}
+
+def is_available(backend):
+    """True if the optional module or program a backend needs is installed."""
+    if backend in _MODULES: return importlib.util.find_spec(_MODULES[backend]) is not None
+    if backend in _COMMANDS: return shutil.which(_COMMANDS[backend]) is not None
+    return True
+
+def available(codec):
+    """Returns the installed backends of a codec, fastest first."""
+    return [backend for backend in DECODERS[codec] if is_available(backend)]
+
+def pick(codec, backend=None):
+    """Returns backend if given (or set in WCP_<CODEC>_DECODER), otherwise the fastest installed one."""
+    backend = backend or os.environ.get(f"WCP_{codec.upper()}_DECODER")
+    if not backend: return available(codec)[0]
+    if backend not in DECODERS[codec]: raise ValueError(f"Unknown {codec} decoder '{backend}'. Use one of {', '.join(DECODERS[codec])}.")
+    if not is_available(backend): raise ValueError(f"The {codec} decoder '{backend}' is not installed.")
+    return backend
+
+@contextmanager
+def _open_process(command):
+    # Streams the program's stdout; its exit status is checked once the stream was used up.
+    # stderr goes to a temporary file, not a pipe: a program filling an unread stderr pipe would block forever.
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr, bufsize=READ_SIZE)
+        try:
+            yield process.stdout
+            # tarfile stops at the end-of-archive marker, drain the padding after it so the program can exit cleanly.
+            while process.stdout.read(READ_SIZE): pass
+            process.wait()
+            if process.returncode:
+                stderr.seek(0)
+                raise OSError(f"{command[0]} failed: {stderr.read().decode('utf-8', 'replace').strip()}")
+        finally:
+            if process.poll() is None: process.kill(); process.wait()
+            process.stdout.close()
+
+@contextmanager
+def open_decoded(codec, source_path, backend=None):
+    """Opens a 'gzip' or 'zstd' compressed file and yields a binary stream of its decompressed content."""
+    backend = pick(codec, backend)
+    if backend == "isal":
+        from isal import igzip_threaded
+        with igzip_threaded.open(source_path, 'rb', threads=1, block_size=READ_SIZE) as stream: yield stream
+    elif backend == "zlib-ng":
+        from zlib_ng import gzip_ng_threaded
+        with gzip_ng_threaded.open(source_path, 'rb', threads=1, block_size=READ_SIZE) as stream: yield stream
+    elif backend == "stdlib":
+        with gzip.open(source_path, 'rb') as stream: yield stream
+    elif backend == "zstandard":
+        with open(source_path, 'rb') as f, zstd.ZstdDecompressor().stream_reader(f, read_size=READ_SIZE) as stream: yield stream
+    else:
+        with _open_process([shutil.which(_COMMANDS[backend]), "-dc", "--", source_path]) as stream: yield stream
@@ -1,58 +1,55 @@
 # Logic to convert DXVK development .zip releases
 
-import os, json, shutil, zipfile
-
-from .archive import create_wcp_archive
-
-def convert(zip_path):
-    # Core logic to convert a single DXVK-dev .zip file
-    if not os.path.exists(zip_path) or not zip_path.endswith(".zip"):
-        print(f"\n[ERROR] File not found or not a .zip file: {zip_path}"); return
+import os, re, json, zipfile
+
+from . import components, engine
+
+def derive_metadata(zip_path):
+    # Derives (version name, version code) from the zip itself: '<variant>-<short hash>' from the commit
+    # hash in the file name, and the newest member date (YYYYMMDD) as the version code. The variant is
+    # the branch or fork named before the hash (e.g. 'dxvk-gplasync-<hash>.zip'), 'master' if none is.
+    # A hash needs at least one letter, so digit-only runs like dates are not taken for one.
+    stem = os.path.basename(zip_path)[:-len(".zip")].lower()
+    hash_match = re.search(r'(?<![0-9a-f])(?=[0-9a-f]*[a-f])([0-9a-f]{7,40})(?![0-9a-f])', stem)
+    if hash_match:
+        words = [word for word in re.split(r'[^a-z0-9]+', stem[:hash_match.start()]) if word and word != "dxvk" and not word.isdigit()]
+        version_name = f"{'-'.join(words) or 'master'}-{hash_match.group(1)[:7]}"
+    else: version_name = re.sub(r'[^a-z0-9._-]', '_', stem.removeprefix("dxvk-")) or "dev"
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        dates = [info.date_time[:3] for info in zip_ref.infolist() if not info.is_dir()]
+    version_code = int("%04d%02d%02d" % max(dates)) if dates else 0
+    return version_name, version_code
+
+def _load_metadata(entry, source):
+    try: return str(entry["versionName"]), int(entry["versionCode"])
+    except (KeyError, TypeError, ValueError): raise ValueError(f"{source} needs a 'versionName' and a numeric 'versionCode'.") from None
+
+def resolve_metadata(zip_path, mapping=None, interactive=True):
+    """
+    Returns (version name, version code) for a dev build. Looked up, in order, from a sidecar
+    '<zip>.json' file, the mapping (file name -> {"versionName", "versionCode"}), the user
+    when interactive (suggesting the derived values), or derived from the zip itself.
+    """
+    for sidecar in (f"{zip_path}.json", f"{zip_path[:-len('.zip')]}.json"):
+        if os.path.exists(sidecar):
+            with open(sidecar, 'r', encoding='utf-8') as f: return _load_metadata(json.load(f), sidecar)
+    if mapping and os.path.basename(zip_path) in mapping:
+        return _load_metadata(mapping[os.path.basename(zip_path)], f"The mapping entry for {os.path.basename(zip_path)}")
+
+    version_name, version_code = derive_metadata(zip_path)
+    if not interactive: return version_name, version_code
 
     # Get version info from the user since dev build filenames are inconsistent
     print(f"\nProcessing Dev Build: {os.path.basename(zip_path)}")
-    version_name = input("Enter DXVK version name (e.g., 2.3-sarek-f1a3b4c): ")
+    version_name = input(f"Enter DXVK version name (e.g., 2.3-sarek-f1a3b4c) [{version_name}]: ").strip() or version_name
     while True:
-        try: version_code = int(input("Enter a numeric version code (e.g., 20231026): ")); break
+        try: version_code = int(input(f"Enter a numeric version code (e.g., 20231026) [{version_code}]: ").strip() or version_code); break
         except ValueError: print("[ERROR] Please enter a valid number.")
+    return version_name, version_code
 
-    base_dir = os.path.dirname(zip_path)
-    extract_dir = os.path.join(base_dir, "dxvk_dev_temp_extraction")
-    
-    try:
-        # Unpack the archive
-        print(f"\nExtracting {os.path.basename(zip_path)}...")
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref: zip_ref.extractall(extract_dir)
-        work_dir = extract_dir # ZIPs often extract directly without a subfolder
-
-        # Rename folders to Winlator standard
-        for arch, new_name in [("x32", "syswow64"), ("x64", "system32")]:
-            if os.path.exists(os.path.join(work_dir, arch)):
-                os.rename(os.path.join(work_dir, arch), os.path.join(work_dir, new_name))
-                print(f"Renamed '{arch}' to '{new_name}'.")
-
-        # Create the profile manifest
-        profile = {"type": "DXVK", "versionName": version_name, "versionCode": version_code, "description": f"DXVK-{version_name}", "files": []}
-        dlls = {"system32": ["d3d9", "d3d10", "d3d10_1", "d3d10core", "d3d11", "dxgi"], "syswow64": ["d3d8", "d3d9", "d3d10", "d3d10_1", "d3d10core", "d3d11", "dxgi"]}
-
-        # Scan for existing DLLs and add them to the manifest
-        print("\nGenerating profile.json...")
-        for folder, dll_list in dlls.items():
-            for dll in dll_list:
-                if os.path.exists(os.path.join(work_dir, folder, f"{dll}.dll")):
-                    profile["files"].append({"source": f"{folder}/{dll}.dll", "target": f"${{{folder}}}/{dll}.dll"})
-        
-        with open(os.path.join(work_dir, "profile.json"), 'w') as f:
-            json.dump(profile, f, indent=4)
-        
-        # Create the final .wcp archive
-        output_path = os.path.join(base_dir, f"dxvk-{version_name}-{version_code}.wcp")
-        create_wcp_archive(work_dir, output_path)
-        print(f"--- Success! Created: {output_path} ---")
-    except Exception as e: print(f"\n[ERROR] An error occurred while processing {zip_path}: {e}")
-    finally:
-        # Clean up the temporary extraction folder
-        if os.path.exists(extract_dir): shutil.rmtree(extract_dir)
+def convert(zip_path, version_name=None, version_code=None, interactive=True, mapping=None):
+    # Converts a single DXVK-dev .zip file through the shared engine, returns the created .wcp path (None on failure)
+    return engine.convert(components.get("dxvk-dev"), zip_path, version_name, version_code, interactive, mapping)
 
 if __name__ == "__main__":
     # This allows the script to be run standalone
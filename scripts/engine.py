@@ -0,0 +1,63 @@
+# The single conversion engine behind every component spec in scripts/components.py.
+
+import os, tarfile, zipfile
+from contextlib import contextmanager
+
+from .archive import iter_tar_members, transcode_to_wcp, open_mapped_zip, transcode_zip_to_wcp
+from .components import load
+from .decoders import open_decoded, SOURCE_CODECS, TAR_BUFSIZE
+
+@contextmanager
+def open_tar_members(source_format, source_path):
+    """Opens a 'tar.gz' or 'tar.zst' source as a stream and yields its (TarInfo, file object) members."""
+    if source_format not in SOURCE_CODECS: raise ValueError(f"Unsupported source format: {source_format}")
+    # Decompress through the fastest installed backend and read the tarball members straight from it.
+    with open_decoded(SOURCE_CODECS[source_format], source_path) as reader:
+        with tarfile.open(fileobj=reader, mode='r|', bufsize=TAR_BUFSIZE) as tar: yield iter_tar_members(tar)
+
+def transcode_zip(spec, zip_ref, output_path, profile):
+    """Packages an open ZipFile (local or remote) into output_path, inflating only the files listed in profile.json."""
+    transcode_zip_to_wcp(zip_ref, output_path, spec["arch_map"], spec["dlls"], profile, spec["strip_root"], spec.get("files"), spec.get("root"))
+
+def transcode(spec, source_path, output_path, profile):
+    """Streams a source archive into output_path, renaming folders to the Winlator standard on the way."""
+    if spec["format"] == "zip":
+        with open_mapped_zip(source_path) as zip_ref: transcode_zip(spec, zip_ref, output_path, profile)
+    else:
+        with open_tar_members(spec["format"], source_path) as members:
+            transcode_to_wcp(members, output_path, spec["arch_map"], spec["dlls"], profile, spec["strip_root"], spec.get("files"), spec.get("root"))
+
+def new_profile(spec, version_name, version_code):
+    """Returns the profile manifest for a version, its 'files' list is filled in while streaming."""
+    return {"type": spec["type"], "versionName": version_name, "versionCode": version_code,
+            "description": spec["description"].format(version=version_name), "files": []}
+
+def output_name(spec, stem, version_name, version_code):
+    """Returns the .wcp file name for a source named stem (without its extension)."""
+    return spec["output"].format(stem=stem, version=version_name, code=version_code)
+
+def resolve_version(spec, source_path, mapping=None, interactive=True):
+    """Returns (version name, version code) through the spec's metadata resolver or filename parser."""
+    if "metadata" in spec: return load(spec["metadata"])(source_path, mapping, interactive)
+    return load(spec["version"])(os.path.basename(source_path)), 0
+
+def convert(spec, source_path, version_name=None, version_code=None, interactive=True, mapping=None):
+    """Converts one source archive described by spec, returns the created .wcp path (None on failure)."""
+    if not os.path.exists(source_path) or not source_path.endswith(spec["extension"]):
+        print(f"\n[ERROR] File not found or not a {spec['extension']} file: {source_path}"); return
+
+    if version_name is None or version_code is None:
+        try: version_name, version_code = resolve_version(spec, source_path, mapping, interactive)
+        except (OSError, ValueError, zipfile.BadZipFile) as e: print(f"\n[ERROR] Could not determine the version of {source_path}: {e}"); return
+    print(f"Detected {spec['display']} Version: {version_name}" + (f" ({version_code})" if version_code else ""))
+
+    filename = os.path.basename(source_path)
+    profile = new_profile(spec, version_name, version_code)
+    output_path = os.path.join(os.path.dirname(source_path), output_name(spec, filename[:-len(spec["extension"])], version_name, version_code))
+
+    try:
+        print(f"\nStreaming {filename}...")
+        transcode(spec, source_path, output_path, profile)
+        print(f"--- Success! Created: {output_path} ---")
+        return output_path
+    except Exception as e: print(f"\n[ERROR] An error occurred while processing {source_path}: {e}")
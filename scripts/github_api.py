@@ -0,0 +1,247 @@
+# Small GitHub REST client for the build trigger scripts, standard library only: pooled keep-alive
+# connections, an on-disk ETag cache for GET requests, concurrent pagination, rate-limit aware
+# pacing with retries, and a dispatcher that runs build triggers concurrently.
+# Point GITHUB_API_URL at a local server (e.g. http://127.0.0.1:8080) to run against a mock API.
+
+import os, re, json, time, queue, random, hashlib, tempfile, threading, subprocess, http.client
+from urllib.parse import urlsplit, urlencode, parse_qs
+from collections import defaultdict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get("WCP_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "wcp_toolkit"), "github")
+PAGE_WORKERS = 8
+MAX_RETRIES = 5
+WRITE_INTERVAL = 1.0 # GitHub asks for at least a second between content-creating requests
+LOW_QUOTA = 50 # Below this many remaining requests, calls are spread out until the limit resets
+SECONDARY_LIMIT_WAIT = 60.0 # GitHub asks to wait at least a minute after a secondary rate limit without Retry-After
+
+class GitHubError(Exception):
+    """An API call answered with an error status (or not at all, status 0)."""
+    def __init__(self, status, message, headers=None):
+        super().__init__(f"HTTP {status}: {message}" if status else message)
+        self.status, self.headers = status, headers or {}
+
+def find_token():
+    """Returns GITHUB_TOKEN / GH_TOKEN, otherwise the token of a logged-in gh CLI (None if neither is set up)."""
+    token = os.environ.get("GITHUB_TOKEN") or os.environ.get("GH_TOKEN")
+    if token: return token
+    try: return subprocess.run(["gh", "auth", "token"], check=True, capture_output=True, text=True).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError): return None
+
+def parse_link_header(value):
+    """Parses a Link header into {rel: url}."""
+    return {rel: url for url, rel in re.findall(r'<([^>]+)>;\s*rel="(\w+)"', value or "")}
+
+class ResponseCache:
+    """GET responses kept on disk with their ETag / Last-Modified, so they can be revalidated for free."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f: return json.load(f)
+        except (OSError, ValueError): return None
+
+    def put(self, key, entry):
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f: json.dump(entry, f)
+        os.replace(tmp, self._path(key))
+
+class GitHubClient:
+    """
+    Sends REST calls over a small pool of persistent connections. GET responses are cached and
+    revalidated with If-None-Match, and GitHub does not count the resulting 304s against the rate limit.
+    """
+
+    def __init__(self, base_url=DEFAULT_API_URL, token=None, cache_dir=DEFAULT_CACHE_DIR, pool_size=PAGE_WORKERS,
+                 max_retries=MAX_RETRIES, write_interval=WRITE_INTERVAL):
+        parts = urlsplit(base_url)
+        self.scheme, self.host, self.prefix = parts.scheme, parts.netloc, parts.path.rstrip('/')
+        self.token = token if token is not None else find_token()
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        self.max_retries, self.write_interval = max_retries, write_interval
+        self.stats = {"requests": 0, "not_modified": 0, "retries": 0}
+        self.rate_limit = {"remaining": None, "reset": None} # From the latest X-RateLimit-* headers
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._pace_lock, self._next_write, self._pause_until = threading.Lock(), 0.0, 0.0
+        # Cache entries are per user, since authenticated responses may include private data.
+        self._cache_scope = hashlib.sha256((self.token or "").encode('utf-8')).hexdigest()[:16]
+
+    def _connect(self):
+        connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return connection_class(self.host, timeout=30)
+
+    def _path(self, endpoint):
+        # Accepts '/repos/...', 'user' or the absolute URLs found in Link headers.
+        if endpoint.startswith(("http://", "https://")):
+            parts = urlsplit(endpoint)
+            return parts.path + (f"?{parts.query}" if parts.query else "")
+        return f"{self.prefix}/{endpoint.lstrip('/')}"
+
+    def _send(self, method, path, body, headers):
+        try: connection, reused = self._pool.get_nowait(), True
+        except queue.Empty: connection, reused = self._connect(), False
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            connection.close()
+            if not reused: raise
+            return self._send(method, path, body, headers) # The server dropped an idle connection, retry on a fresh one
+        except (OSError, http.client.HTTPException):
+            connection.close(); raise
+        try: self._pool.put_nowait(connection)
+        except queue.Full: connection.close()
+        return response.status, {name.lower(): value for name, value in response.getheaders()}, data
+
+    def _wait_turn(self, method):
+        # Every thread waits out a rate-limit pause; writes, and every call once the quota runs low, are spaced out.
+        with self._pace_lock:
+            now = time.time()
+            start = max(now, self._pause_until)
+            interval = self.write_interval if method != "GET" else 0.0
+            remaining, reset = self.rate_limit["remaining"], self.rate_limit["reset"]
+            if remaining is not None and reset and remaining < LOW_QUOTA: interval = max(interval, (reset - now) / max(remaining, 1))
+            if interval: start = max(start, self._next_write); self._next_write = start + interval
+        if start > now: time.sleep(start - now)
+
+    def _pause(self, seconds, reason):
+        with self._pace_lock: self._pause_until = max(self._pause_until, time.time() + seconds)
+        self.stats["retries"] += 1
+        print(f"[WAIT] {reason}, pausing API calls for {seconds:.0f}s...")
+
+    @staticmethod
+    def _backoff(attempt, base=1.0, cap=120.0):
+        # Exponential backoff with random jitter, so concurrent callers don't retry in lockstep.
+        return random.uniform(base, max(base, min(cap, base * 2 ** (attempt + 1))))
+
+    def _retry_delay(self, method, status, headers, parsed, attempt):
+        # Seconds to wait before retrying this response, or None if it must not be retried.
+        if status in (403, 429):
+            if "retry-after" in headers:
+                try: return float(headers["retry-after"])
+                except ValueError: pass
+            if headers.get("x-ratelimit-remaining") == "0" and "x-ratelimit-reset" in headers:
+                return max(1.0, float(headers["x-ratelimit-reset"]) - time.time() + 1)
+            message = parsed.get("message", "") if isinstance(parsed, dict) else ""
+            if "secondary rate limit" in message.lower(): return SECONDARY_LIMIT_WAIT + self._backoff(attempt, cap=300.0)
+            return None # A plain permission error
+        # Server errors are only retried for reads, a retried write could run twice.
+        if status >= 500 and method == "GET": return self._backoff(attempt)
+        return None
+
+    def request(self, method, endpoint, body=None, use_cache=True):
+        """
+        Sends one call and returns (status, lower-cased headers, parsed JSON or None). Rate-limited
+        responses are retried after Retry-After / the limit reset. Raises GitHubError on failure.
+        Pass use_cache=False for responses that only live in their headers, like download redirects.
+        """
+        path = self._path(endpoint)
+        headers = {"Accept": "application/vnd.github+json", "X-GitHub-Api-Version": "2022-11-28", "User-Agent": "Winlator-WCP-Toolkit"}
+        if self.token: headers["Authorization"] = f"Bearer {self.token}"
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        if payload is not None: headers["Content-Type"] = "application/json"
+
+        key = cached = None
+        if method == "GET" and self.cache and use_cache:
+            key = hashlib.sha256(f"{self._cache_scope}:{self.host}{path}".encode('utf-8')).hexdigest()
+            cached = self.cache.get(key)
+            if cached and cached.get("etag"): headers["If-None-Match"] = cached["etag"]
+            elif cached and cached.get("last_modified"): headers["If-Modified-Since"] = cached["last_modified"]
+
+        for attempt in range(self.max_retries + 1):
+            self._wait_turn(method)
+            try: status, response_headers, data = self._send(method, path, payload, headers)
+            except (OSError, http.client.HTTPException) as e:
+                if method != "GET" or attempt == self.max_retries: raise GitHubError(0, f"Could not reach {self.host}: {e}") from None
+                self._pause(self._backoff(attempt), f"Could not reach {self.host}"); continue
+            self.stats["requests"] += 1
+            if "x-ratelimit-remaining" in response_headers:
+                try: self.rate_limit = {"remaining": int(response_headers["x-ratelimit-remaining"]), "reset": float(response_headers.get("x-ratelimit-reset", 0))}
+                except ValueError: pass
+
+            if status == 304 and cached:
+                self.stats["not_modified"] += 1
+                return 200, {**response_headers, "link": cached.get("link", "")}, cached["body"]
+            try: parsed = json.loads(data) if data else None
+            except ValueError: parsed = None
+            delay = self._retry_delay(method, status, response_headers, parsed, attempt) if status >= 400 and attempt < self.max_retries else None
+            if delay is None: break
+            self._pause(delay, f"GitHub answered {status} for {endpoint}")
+
+        if status >= 400:
+            message = parsed.get("message") if isinstance(parsed, dict) else data.decode('utf-8', 'replace')[:200]
+            raise GitHubError(status, message or "request failed", response_headers)
+        if key and (response_headers.get("etag") or response_headers.get("last-modified")):
+            self.cache.put(key, {"etag": response_headers.get("etag"), "last_modified": response_headers.get("last-modified"),
+                                 "link": response_headers.get("link", ""), "body": parsed})
+        return status, response_headers, parsed
+
+    def get(self, endpoint):
+        """Returns the parsed JSON of a GET call."""
+        return self.request("GET", endpoint)[2]
+
+    def paginate(self, endpoint, key=None, per_page=100, workers=PAGE_WORKERS):
+        """
+        Returns every item of a list endpoint (the list under `key` for responses like {"workflow_runs": [...]}).
+        Page 1 tells how many pages there are, the rest are then fetched concurrently.
+        """
+        first = f"{endpoint}{'&' if '?' in endpoint else '?'}{urlencode({'per_page': per_page})}"
+        _, headers, data = self.request("GET", first)
+        items = list((data or {}).get(key, []) if key else data or [])
+        links = parse_link_header(headers.get("link"))
+
+        last_page = parse_qs(urlsplit(links["last"]).query).get("page", [None])[0] if "last" in links else None
+        if last_page:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                pages = pool.map(lambda page: self.get(f"{first}&page={page}"), range(2, int(last_page) + 1))
+                for page in pages: items.extend((page or {}).get(key, []) if key else page or [])
+            return items
+        # No 'last' link (some endpoints only announce the next page): follow the pages one by one.
+        while "next" in links:
+            _, headers, data = self.request("GET", links["next"])
+            items.extend((data or {}).get(key, []) if key else data or [])
+            links = parse_link_header(headers.get("link"))
+        return items
+
+    def close(self):
+        while True:
+            try: self._pool.get_nowait().close()
+            except queue.Empty: break
+
+class Dispatcher:
+    """
+    Runs build triggers on a thread pool, at most `concurrency` at once, with the client pacing the
+    API calls. Jobs that push to the same branch wrap that step in serialized(branch): one job at a
+    time, at least `serial_gap` seconds apart, so every push starts its own workflow run.
+    """
+
+    def __init__(self, concurrency=4, serial_gap=5.0):
+        self.concurrency, self.serial_gap = max(1, concurrency), serial_gap
+        self._locks, self._last_release, self._guard = defaultdict(threading.Lock), {}, threading.Lock()
+
+    @contextmanager
+    def serialized(self, key):
+        with self._guard: lock = self._locks[key]
+        with lock:
+            wait = self._last_release.get(key, 0.0) + self.serial_gap - time.monotonic()
+            if wait > 0: time.sleep(wait)
+            try: yield
+            finally: self._last_release[key] = time.monotonic()
+
+    def run(self, jobs):
+        """Runs (label, function) jobs and returns {label: result}; a job that raises counts as a False result."""
+        def run_one(label, function):
+            try: return function()
+            except Exception as e: print(f"[ERROR] {label} failed: {e}"); return False
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = {label: pool.submit(run_one, label, function) for label, function in jobs}
+            return {label: future.result() for label, future in futures.items()}
@@ -0,0 +1,147 @@
+# Lightweight per-stage timing and byte counters for the converters, plus report sinks.
+# Disabled by default: stage() then returns a shared no-op context and streams are not wrapped.
+
+import os, sys, json, time
+from contextlib import contextmanager, nullcontext
+
+_enabled = False
+_job = None # The record of the job currently running in this process
+_NULL_STAGE = nullcontext()
+
+def enable(flag=True):
+    """Turns metric collection on (or off) for this process."""
+    global _enabled
+    _enabled = flag
+
+def is_enabled():
+    return _enabled
+
+def begin_job(source_path, converter, carried=None):
+    """Starts a fresh record for one conversion job, or continues a record carried over from detach_job()."""
+    global _job
+    if not _enabled: return
+    if carried:
+        _job = {**carried, "stages": dict(carried["stages"]), "counters": dict(carried["counters"])}
+        _job["_start"] = time.perf_counter() - _job.pop("_elapsed")
+    else: _job = {"source": os.path.basename(source_path), "converter": converter, "stages": {}, "counters": {}, "_start": time.perf_counter()}
+
+def detach_job():
+    """
+    Pauses the current record and returns it (None when disabled), so a job that goes on elsewhere,
+    e.g. in a pool worker after a cache miss, keeps its earlier stages. Picked up again by begin_job().
+    """
+    global _job
+    if not _enabled or _job is None: return None
+    job, _job = _job, None
+    job["_elapsed"] = time.perf_counter() - job.pop("_start")
+    return job
+
+def end_job(source_path, output_path, cache_hit=False):
+    """Finishes the current record with sizes and ratios and returns it (None when disabled)."""
+    global _job
+    if not _enabled: return None
+    job = _job or {"source": os.path.basename(source_path), "stages": {}, "counters": {}, "_start": time.perf_counter()}
+    _job = None
+    job["wall_s"] = time.perf_counter() - job.pop("_start")
+    job["status"] = "ok" if output_path else "failed"
+    job["cache_hit"] = cache_hit
+    job["output"] = os.path.basename(output_path) if output_path else None
+    job["input_bytes"] = os.path.getsize(source_path) if os.path.exists(source_path) else None
+    job["output_bytes"] = os.path.getsize(output_path) if output_path and os.path.exists(output_path) else None
+    # Compression ratio is the uncompressed tar payload over the final .wcp size.
+    payload = job["counters"].get("payload_bytes")
+    job["compression_ratio"] = payload / job["output_bytes"] if payload and job["output_bytes"] else None
+    # 'encode' wraps the disk writes, so report it exclusive of them.
+    if "encode" in job["stages"] and "disk_write" in job["stages"]: job["stages"]["encode"] -= job["stages"]["disk_write"]
+    return job
+
+def _add_time(name, seconds):
+    if _job is not None: _job["stages"][name] = _job["stages"].get(name, 0.0) + seconds
+
+def count(name, amount=1):
+    """Adds to a named counter of the current job."""
+    if _enabled and _job is not None: _job["counters"][name] = _job["counters"].get(name, 0) + amount
+
+@contextmanager
+def _timed_stage(name):
+    start = time.perf_counter()
+    try: yield
+    finally: _add_time(name, time.perf_counter() - start)
+
+def stage(name):
+    """Context manager timing a named stage of the current job."""
+    return _timed_stage(name) if _enabled else _NULL_STAGE
+
+class _TimedStream:
+    # Forwards to a file object, charging time spent in read()/write() to a stage and counting bytes.
+    def __init__(self, stream, stage_name, counter):
+        self._stream, self._stage, self._counter = stream, stage_name, counter
+
+    def read(self, *args):
+        start = time.perf_counter()
+        data = self._stream.read(*args)
+        _add_time(self._stage, time.perf_counter() - start); count(self._counter, len(data))
+        return data
+
+    def write(self, data):
+        start = time.perf_counter()
+        written = self._stream.write(data)
+        _add_time(self._stage, time.perf_counter() - start); count(self._counter, len(data))
+        return written
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+def timed_stream(stream, stage_name, counter):
+    """Wraps a file object so its reads/writes are timed as stage_name; returns it unchanged when disabled."""
+    return _TimedStream(stream, stage_name, counter) if _enabled and stream is not None else stream
+
+class ConsoleSink:
+    """Prints one timing line per job and a batch summary."""
+    def job(self, record):
+        stages = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in record["stages"].items())
+        ratio = f", ratio {record['compression_ratio']:.2f}" if record.get("compression_ratio") else ""
+        print(f"[METRICS] {record['source']}: {record['status']}{' (cache)' if record['cache_hit'] else ''} in {record['wall_s']:.2f}s{ratio}" + (f" ({stages})" if stages else ""))
+    def summary(self, summary):
+        print(f"[METRICS] {summary['job_count']} job(s), {summary['failed']} failed, {summary['cache_hits']} cache hit(s), {summary['wall_s']:.2f}s total.")
+    def close(self): pass
+
+class NdjsonSink:
+    """Appends one JSON object per job, then a 'batch' summary line, to a newline-delimited JSON file."""
+    def __init__(self, path): self._file = open(path, 'a', encoding='utf-8')
+    def job(self, record): self._file.write(json.dumps({"type": "job", **record}) + "\n")
+    def summary(self, summary): self._file.write(json.dumps({"type": "batch", **summary}) + "\n")
+    def close(self): self._file.close()
+
+class JsonSink:
+    """Writes a single JSON document holding the batch summary and every job record."""
+    def __init__(self, path): self._path, self._jobs = path, []
+    def job(self, record): self._jobs.append(record)
+    def summary(self, summary): self._summary = summary
+    def close(self):
+        with open(self._path, 'w', encoding='utf-8') as f: json.dump({**getattr(self, "_summary", {}), "jobs": self._jobs}, f, indent=4)
+
+def sink_for_path(path):
+    """Picks the report format from the file extension (.ndjson / .jsonl, otherwise JSON)."""
+    return NdjsonSink(path) if path.endswith((".ndjson", ".jsonl")) else JsonSink(path)
+
+class RunReport:
+    """Collects job records from a batch and fans them out to every sink."""
+    def __init__(self, sinks):
+        self.sinks, self.records, self._start = sinks, [], time.perf_counter()
+        self.started = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+
+    def add(self, record):
+        if record is None: return
+        self.records.append(record)
+        for sink in self.sinks: sink.job(record)
+
+    def close(self):
+        summary = {"started": self.started, "wall_s": time.perf_counter() - self._start, "job_count": len(self.records),
+                   "failed": sum(1 for r in self.records if r["status"] != "ok"),
+                   "cache_hits": sum(1 for r in self.records if r["cache_hit"]),
+                   "input_bytes": sum(r["input_bytes"] or 0 for r in self.records),
+                   "output_bytes": sum(r["output_bytes"] or 0 for r in self.records),
+                   "python": sys.version.split()[0]}
+        for sink in self.sinks: sink.summary(summary); sink.close()
+        return summary
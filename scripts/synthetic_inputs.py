@@ -0,0 +1,80 @@
+# Generates synthetic source archives shaped like real DXVK / vkd3d-proton / DXVK-dev releases,
+# so the converters can be benchmarked offline. Output is deterministic for a given seed: archive
+# timestamps are fixed rather than taken from the clock.
+
+import io, os, gzip, random, struct, tarfile, zipfile
+import zstandard as zstd
+
+DXVK_DLLS = ["d3d8", "d3d9", "d3d10", "d3d10_1", "d3d10core", "d3d11", "dxgi"]
+VKD3D_DLLS = ["d3d12", "d3d12core"]
+BLOCK_SIZE = 4096
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0) # The earliest timestamp a zip can hold
+
+# IMAGE_FILE_HEADER.Machine of the DLLs in each source folder, so scripts/verify.py accepts the converted packages.
+ARCH_MACHINES = {"x64": 0x8664, "x32": 0x14c, "x86": 0x14c}
+
+def pe_header(machine):
+    """Returns a BLOCK_SIZE-byte block holding a minimal DOS stub and PE file header for machine."""
+    header = bytearray(BLOCK_SIZE)
+    header[:2], header[0x3c:0x40] = b"MZ", struct.pack("<I", 0x80) # e_lfanew
+    header[0x80:0x86] = b"PE\0\0" + struct.pack("<H", machine)
+    return bytes(header)
+
+def synthetic_dll(size, rng, machine=0x8664):
+    """Returns `size` bytes that compress roughly like a real PE DLL (a mix of code-like, table-like and padding blocks)."""
+    # A small vocabulary of repeated 'instructions' keeps the data compressible, as machine code is.
+    vocabulary = [rng.randbytes(rng.randint(2, 8)) for _ in range(256)]
+    blocks, total = [pe_header(machine)], BLOCK_SIZE
+    while total < size:
+        kind = rng.random()
+        if kind < 0.35: block = rng.randbytes(BLOCK_SIZE) # Data that does not compress
+        elif kind < 0.9: block = b"".join(rng.choices(vocabulary, k=BLOCK_SIZE // 4))[:BLOCK_SIZE]
+        else: block = bytes(BLOCK_SIZE) # Section padding
+        blocks.append(block); total += len(block)
+    return b"".join(blocks)[:size]
+
+def _dll_names(base_names, count):
+    # Uses the real DLL names first, then pads with extra ones if a larger count is requested.
+    return (base_names + [f"extra{i}" for i in range(max(0, count - len(base_names)))])[:count]
+
+def _members(root, arch_dirs, base_names, dll_count, dll_size, seed):
+    rng = random.Random(seed)
+    prefix = f"{root}/" if root else ""
+    for arch in arch_dirs:
+        for name in _dll_names(base_names, dll_count):
+            yield f"{prefix}{arch}/{name}.dll", synthetic_dll(dll_size, rng, ARCH_MACHINES[arch])
+
+def _write_tar(tar, members):
+    dirs = set()
+    for name, data in members:
+        for i in range(1, name.count('/') + 1):
+            parent = name.rsplit('/', name.count('/') - i + 1)[0]
+            if parent not in dirs:
+                info = tarfile.TarInfo(parent); info.type, info.mode = tarfile.DIRTYPE, 0o755
+                tar.addfile(info); dirs.add(parent)
+        info = tarfile.TarInfo(name); info.size, info.mode = len(data), 0o644
+        tar.addfile(info, io.BytesIO(data))
+
+def make_dxvk_release(output_dir, version="2.3", dll_count=7, dll_size=4 * 1024**2, seed=0):
+    """Writes 'dxvk-<version>.tar.gz' with x32/x64 folders under a top-level directory."""
+    path = os.path.join(output_dir, f"dxvk-{version}.tar.gz")
+    # mtime=0: the gzip header would otherwise carry the current time.
+    with gzip.GzipFile(path, 'wb', mtime=0) as f, tarfile.open(mode='w', fileobj=f) as tar:
+        _write_tar(tar, _members(f"dxvk-{version}", ["x64", "x32"], DXVK_DLLS, dll_count, dll_size, seed))
+    return path
+
+def make_vkd3d_proton_release(output_dir, version="2.11", dll_count=2, dll_size=8 * 1024**2, seed=0):
+    """Writes 'vkd3d-proton-<version>.tar.zst' with x86/x64 folders under a top-level directory."""
+    path = os.path.join(output_dir, f"vkd3d-proton-{version}.tar.zst")
+    with open(path, 'wb') as f, zstd.ZstdCompressor(level=10).stream_writer(f) as writer:
+        with tarfile.open(mode='w|', fileobj=writer) as tar:
+            _write_tar(tar, _members(f"vkd3d-proton-{version}", ["x64", "x86"], VKD3D_DLLS, dll_count, dll_size, seed))
+    return path
+
+def make_dxvk_dev_build(output_dir, commit="8f0583d9954a", dll_count=7, dll_size=4 * 1024**2, seed=0):
+    """Writes a flat 'dxvk-master-<commit>.zip' like the GitHub Actions dev builds."""
+    path = os.path.join(output_dir, f"dxvk-master-{commit}.zip")
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        for name, data in _members("", ["x64", "x32"], DXVK_DLLS, dll_count, dll_size, seed):
+            zip_ref.writestr(zipfile.ZipInfo(name, ZIP_DATE_TIME), data, zipfile.ZIP_DEFLATED)
+    return path
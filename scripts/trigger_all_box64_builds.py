@@ -1,9 +1,19 @@
 # script to fetch all recent, compatible release tags from the official Box64 repository and trigger the 'Compile-Box64.yml' workflow in a personal fork for each tag.
 
-import sys, subprocess, json, time, shutil
+import sys, subprocess, json, time, shutil, argparse
+
+try: # Run as 'python scripts/trigger_all_box64_builds.py'
+    from github_api import GitHubClient, GitHubError, Dispatcher
+    from build_ledger import BuildLedger
+except ImportError:
+    try: # Run as 'python -m scripts.trigger_all_box64_builds'
+        from .github_api import GitHubClient, GitHubError, Dispatcher
+        from .build_ledger import BuildLedger
+    except ImportError: GitHubClient = None # A lone downloaded copy of this script: every call goes through 'gh'
 
 # --- CONFIGURATION ---
 MINIMUM_COMPATIBLE_TAG = "v0.2.8"
+RUN_TITLE_PATTERN = r"Build Box64 (\S+)" # The run-name set in Compile-Box64.yml
 
 def run_gh_command(command_list):
     """Executes a GitHub CLI command and handles errors."""
@@ -15,10 +25,43 @@ def run_gh_command(command_list):
         print(f"\n[ERROR] Command failed: {' '.join(command_list)}\n--- STDERR ---\n{stderr}")
         return None
 
+def fetch_release_tags(client):
+    """Returns every release tag of ptitSeb/box64 (None on failure)."""
+    if client:
+        try: return [release['tag_name'] for release in client.paginate("/repos/ptitSeb/box64/releases")]
+        except GitHubError as e: print(f"\n[ERROR] Could not list the releases:\n{e}"); return None
+    release_list_json = run_gh_command(["gh", "release", "list", "--repo", "ptitSeb/box64", "--json", "tagName", "--limit", "1000"])
+    if release_list_json is None: return None
+    try: return [release['tagName'] for release in json.loads(release_list_json)]
+    except json.JSONDecodeError: print("[ERROR] Failed to parse the list of releases from GitHub."); return None
+
+def trigger_workflow(client, repo_path, workflow_name, tag):
+    """Dispatches the build workflow for one tag, returns True on success."""
+    if client:
+        try: client.request("POST", f"/repos/{repo_path}/actions/workflows/{workflow_name}/dispatches", {"ref": "main", "inputs": {"box64_version_ref": tag}}); return True
+        except GitHubError as e: print(f"\n[ERROR] Could not trigger {workflow_name} for {tag}:\n{e}"); return False
+    trigger_command = [
+        "gh", "workflow", "run", workflow_name,
+        "--repo", repo_path,
+        "--ref", "main",
+        "-f", f"box64_version_ref={tag}"
+    ]
+    return run_gh_command(trigger_command) is not None
+
 def main():
     """Main function to run the batch build trigger."""
-    if not shutil.which("gh"): print("[FATAL ERROR] GitHub CLI ('gh') is not installed."); sys.exit(1)
-    if run_gh_command(["gh", "auth", "status"]) is None: print("[FATAL ERROR] Not logged in to GitHub CLI. Please run 'gh auth login'."); sys.exit(1)
+    parser = argparse.ArgumentParser(description="Trigger the Compile-Box64 workflow in your fork for every compatible Box64 release.")
+    parser.add_argument("--concurrency", type=int, default=4, help="How many workflows to dispatch at once (default: 4).")
+    parser.add_argument("--force", action="store_true", help="Build every tag again, even those the build ledger shows as already built.")
+    args = parser.parse_args()
+
+    client = GitHubClient() if GitHubClient else None
+    if client:
+        try: client.get("/user")
+        except GitHubError: print("[FATAL ERROR] Not logged in to GitHub. Please run 'gh auth login' or set GITHUB_TOKEN."); sys.exit(1)
+    else:
+        if not shutil.which("gh"): print("[FATAL ERROR] GitHub CLI ('gh') is not installed."); sys.exit(1)
+        if run_gh_command(["gh", "auth", "status"]) is None: print("[FATAL ERROR] Not logged in to GitHub CLI. Please run 'gh auth login'."); sys.exit(1)
 
     print("--- Box64 Batch Build Trigger ---")
     username = input("Enter your GitHub username: ")
@@ -28,43 +71,46 @@ def main():
 
     print("\nFetching all release tags from the official ptitSeb/box64 repository...")
     
-    release_list_json = run_gh_command(["gh", "release", "list", "--repo", "ptitSeb/box64", "--json", "tagName"])
-    if release_list_json is None: sys.exit(1)
-        
-    try:
-        releases = json.loads(release_list_json)
-        # Filter for official release tags AND ensure they meet the minimum version requirement.
-        tags_to_build = [
-            release['tagName'] for release in releases 
-            if release['tagName'].startswith('v') and release['tagName'] >= MINIMUM_COMPATIBLE_TAG
-        ]
-    except json.JSONDecodeError:
-        print("[FATAL ERROR] Failed to parse the list of releases from GitHub."); sys.exit(1)
+    release_tags = fetch_release_tags(client)
+    if release_tags is None: sys.exit(1)
+
+    # Filter for official release tags AND ensure they meet the minimum version requirement.
+    tags_to_build = [tag for tag in release_tags if tag.startswith('v') and tag >= MINIMUM_COMPATIBLE_TAG]
 
     if not tags_to_build:
         print(f"[ERROR] No compatible release tags found from {MINIMUM_COMPATIBLE_TAG} onwards. Aborting."); sys.exit(1)
 
     print(f"Found {len(tags_to_build)} compatible release tags to build (from {MINIMUM_COMPATIBLE_TAG} onwards).")
+
+    ledger = BuildLedger(repo_path) if client else None
+    if ledger and not args.force:
+        print("Checking your fork's previous builds...")
+        try: ledger.sync(client, workflow_name, RUN_TITLE_PATTERN, "?event=workflow_dispatch")
+        except GitHubError as e: print(f"[WARN] Could not read the workflow runs, building every tag: {e}")
+        skipped = [tag for tag in tags_to_build if not ledger.needs_build(tag)]
+        tags_to_build = [tag for tag in tags_to_build if tag not in skipped]
+        if skipped: print(f"Skipping {len(skipped)} tag(s) already built or in progress: {', '.join(sorted(skipped))}")
+        if not tags_to_build: print("Every compatible tag is already built. Use --force to build them again."); return
     print("The script will now trigger a workflow for each tag.")
     print("-" * 50); time.sleep(3)
 
-    for tag in sorted(tags_to_build): # Sort to ensure chronological build order
+    def trigger(tag):
         print(f"--> Triggering workflow for tag: {tag}")
-        
-        trigger_command = [
-            "gh", "workflow", "run", workflow_name,
-            "--repo", repo_path,
-            "--ref", "main",
-            "-f", f"box64_version_ref={tag}"
-        ]
-        
-        if run_gh_command(trigger_command) is not None:
+        if trigger_workflow(client, repo_path, workflow_name, tag):
             print(f"    Workflow for {tag} triggered successfully.")
-            print("    Waiting 30 seconds to avoid overwhelming the API...")
-            time.sleep(30)
-        else:
-            print(f"    Failed to trigger workflow for {tag}. Continuing...")
-    
+            if ledger: ledger.record_trigger(tag)
+            return True
+        print(f"    Failed to trigger workflow for {tag}. Continuing..."); return False
+
+    if client:
+        # Dispatched concurrently; the API client paces the calls from the rate-limit headers instead of fixed waits.
+        Dispatcher(args.concurrency).run([(tag, lambda tag=tag: trigger(tag)) for tag in sorted(tags_to_build)])
+    else:
+        for tag in sorted(tags_to_build): # Sort to ensure chronological build order
+            if trigger(tag):
+                print("    Waiting 30 seconds to avoid overwhelming the API...")
+                time.sleep(30)
+
     print("-" * 50)
     print("All build workflows have been triggered successfully!")
     print("Check your repository's 'Actions' tab to monitor their progress and download the artifacts.")
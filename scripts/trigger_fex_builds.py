@@ -1,53 +1,130 @@
 # remotely build specific FEX tags, commits, or the latest main branch.
 
-import sys, subprocess, json, time, shutil
+import sys, subprocess, json, time, shutil, hashlib, argparse
+from contextlib import nullcontext
+
+try: # Run as 'python scripts/trigger_fex_builds.py'
+    from github_api import GitHubClient, GitHubError, Dispatcher
+    from build_ledger import BuildLedger
+except ImportError:
+    try: # Run as 'python -m scripts.trigger_fex_builds'
+        from .github_api import GitHubClient, GitHubError, Dispatcher
+        from .build_ledger import BuildLedger
+    except ImportError: GitHubClient = None # A lone downloaded copy of this script: every call goes through 'gh'
 
 MINIMUM_COMPATIBLE_TAG = "FEX-2507" # Older tags use an incompatible build system.
+WORKFLOW_FILE = "Compile-FEXCore.yml"
+RUN_TITLE_PATTERN = r"Build: Prepare FEX tag (\S+)" # The commit message trigger_build pushes, shown as the run title
+
+client = None # The pooled, caching API client, set up in main() when available
 
-def run_gh_api_command(endpoint, method="GET", raw_body=None):
-    """Executes a GitHub API command using 'gh', supporting passing data via stdin."""
+def run_gh_api_command(endpoint, method="GET", body=None):
+    """Executes a GitHub API call through the API client, or the 'gh' CLI (passing the body via stdin) without it."""
+    if client:
+        try: return client.request(method, endpoint, body)[2] or {}
+        except GitHubError as e: print(f"\n[ERROR] API command failed for {endpoint}:\n{e}"); return None
     command = ["gh", "api", endpoint, "--method", method]
-    if raw_body: command.extend(["--input", "-"])
+    if body is not None: command.extend(["--input", "-"])
     try:
-        result = subprocess.run(command, check=True, capture_output=True, text=True, encoding='utf-8', input=raw_body)
+        result = subprocess.run(command, check=True, capture_output=True, text=True, encoding='utf-8', input=json.dumps(body) if body is not None else None)
         return json.loads(result.stdout) if result.stdout else {}
     except (subprocess.CalledProcessError, FileNotFoundError) as e:
         stderr = e.stderr.strip() if hasattr(e, 'stderr') else "gh command not found."
         print(f"\n[ERROR] API command failed for {endpoint}:\n--- STDERR ---\n{stderr}"); return None
     except json.JSONDecodeError: print(f"\n[ERROR] Failed to parse JSON response from {endpoint}"); return None
 
-def trigger_build(repo_path, build_branch, ref_name, commit_sha, custom_files):
-    """Core logic to trigger a single build for a given commit."""
+def fetch_all_pages(endpoint):
+    """Returns every item of a paginated list endpoint (None on failure), with pages fetched concurrently by the API client."""
+    if client:
+        try: return client.paginate(endpoint)
+        except GitHubError as e: print(f"\n[ERROR] API command failed for {endpoint}:\n{e}"); return None
+    try:
+        result = subprocess.run(["gh", "api", "--paginate", endpoint, "--jq", ".[]"], check=True, capture_output=True, text=True, encoding='utf-8')
+        return [json.loads(line) for line in result.stdout.splitlines() if line]
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        stderr = e.stderr.strip() if hasattr(e, 'stderr') else "gh command not found."
+        print(f"\n[ERROR] API command failed for {endpoint}:\n--- STDERR ---\n{stderr}"); return None
+    except json.JSONDecodeError: print(f"\n[ERROR] Failed to parse JSON response from {endpoint}"); return None
+
+def merged_tree_key(ref_name, commit_sha, custom_files):
+    """Identifies a prepared build commit: same ref, same base commit and same custom build files."""
+    files = sorted((item["path"], item["mode"], item["sha"]) for item in custom_files.values())
+    return hashlib.sha256(json.dumps([ref_name, commit_sha, files]).encode('utf-8')).hexdigest()
+
+def create_build_commit(repo_path, ref_name, commit_sha, custom_files, tree_sha=None):
+    """Creates the build commit (and its merged tree, unless given), returns (tree sha, commit sha) or None."""
+    if tree_sha is None:
+        print("    1. Fetching base tree from the commit..."); base_tree = run_gh_api_command(f"/repos/FEX-Emu/FEX/git/trees/{commit_sha}");
+        if base_tree is None: return None
+
+        print("    2. Creating new merged tree via API..."); new_tree_payload = {"base_tree": base_tree["sha"], "tree": list(custom_files.values())}
+        created_tree = run_gh_api_command(f"/repos/{repo_path}/git/trees", "POST", new_tree_payload)
+        if created_tree is None: return None
+        tree_sha = created_tree["sha"]
+
+    print("    3. Creating new commit via API..."); commit_payload = {"message": f"Build: Prepare FEX tag {ref_name}", "tree": tree_sha, "parents": [commit_sha]}
+    new_commit = run_gh_api_command(f"/repos/{repo_path}/git/commits", "POST", commit_payload)
+    return (tree_sha, new_commit["sha"]) if new_commit else None
+
+def trigger_build(repo_path, build_branch, ref_name, commit_sha, custom_files, dispatcher=None, ledger=None):
+    """
+    Core logic to trigger a single build for a given commit. With a dispatcher, only the branch update is
+    serialized. With a ledger, a build commit prepared earlier for the same inputs is pushed again as is.
+    """
     print(f"\n--> Preparing to build ref: {ref_name} (Commit: {commit_sha[:7]})")
-    
-    print("    1. Fetching base tree from the commit..."); base_tree = run_gh_api_command(f"/repos/FEX-Emu/FEX/git/trees/{commit_sha}");
-    if base_tree is None: return False
-    
-    print("    2. Creating new merged tree via API..."); new_tree_payload = {"base_tree": base_tree["sha"], "tree": list(custom_files.values())}
-    created_tree = run_gh_api_command(f"/repos/{repo_path}/git/trees", "POST", raw_body=json.dumps(new_tree_payload))
-    if created_tree is None: return False
 
-    print("    3. Creating new commit via API..."); commit_payload = {"message": f"Build: Prepare FEX tag {ref_name}", "tree": created_tree["sha"], "parents": [commit_sha]}
-    new_commit = run_gh_api_command(f"/repos/{repo_path}/git/commits", "POST", raw_body=json.dumps(commit_payload))
-    if new_commit is None: return False
+    key = merged_tree_key(ref_name, commit_sha, custom_files)
+    cached = ledger.cached_tree(key) if ledger else None
+    if cached: print("    1-3. Reusing the merged tree and commit prepared by an earlier build..."); tree_sha, build_commit = cached["tree"], cached["commit"]
+    else:
+        created = create_build_commit(repo_path, ref_name, commit_sha, custom_files)
+        if created is None: return False
+        tree_sha, build_commit = created
+        if ledger: ledger.remember_tree(key, tree_sha, build_commit)
+
+    # Every push to the build branch starts one workflow run, so concurrent triggers take turns here.
+    with dispatcher.serialized(build_branch) if dispatcher else nullcontext():
+        updated = True
+        if cached:
+            # Pushing the commit the branch already points at would not start a run, so make a fresh one from the cached tree.
+            branch_ref = run_gh_api_command(f"/repos/{repo_path}/git/ref/heads/{build_branch}")
+            if branch_ref is None or branch_ref.get("object", {}).get("sha") == build_commit:
+                created = create_build_commit(repo_path, ref_name, commit_sha, custom_files, tree_sha)
+                if created: build_commit = created[1]; ledger.remember_tree(key, tree_sha, build_commit)
+                else: updated = False
+        if updated:
+            print(f"    4. Updating '{build_branch}' branch to trigger build..."); update_payload = {"sha": build_commit, "force": True}
+            updated = run_gh_api_command(f"/repos/{repo_path}/git/refs/heads/{build_branch}", "PATCH", update_payload) is not None
+    if not updated:
+        if not cached: return False
+        # The cached objects may have been garbage collected by GitHub, prepare everything again.
+        print("    The cached build commit is no longer usable, preparing a new one...")
+        ledger.forget_tree(key)
+        return trigger_build(repo_path, build_branch, ref_name, commit_sha, custom_files, dispatcher, ledger)
+    if ledger: ledger.record_trigger(ref_name, commit_sha, build_commit)
 
-    print(f"    4. Updating '{build_branch}' branch to trigger build..."); update_payload = {"sha": new_commit["sha"], "force": True}
-    run_gh_api_command(f"/repos/{repo_path}/git/refs/heads/{build_branch}", "PATCH", raw_body=json.dumps(update_payload))
-    
     print(f"    Workflow for {ref_name} triggered successfully.")
     return True
 
 def main():
-    if not shutil.which("gh"): print("[FATAL ERROR] GitHub CLI ('gh') is not installed."); sys.exit(1)
-    if run_gh_api_command("user") is None: print("[FATAL ERROR] Not logged in to GitHub CLI. Please run 'gh auth login'."); sys.exit(1)
+    parser = argparse.ArgumentParser(description="Remotely build FEX tags, commits, or the latest main branch in your fork.")
+    parser.add_argument("--concurrency", type=int, default=4, help="How many tags to prepare at once when building all tags (default: 4).")
+    parser.add_argument("--force", action="store_true", help="Build all tags again, even those the build ledger shows as already built.")
+    args = parser.parse_args()
+
+    global client
+    if GitHubClient: client = GitHubClient()
+    elif not shutil.which("gh"): print("[FATAL ERROR] GitHub CLI ('gh') is not installed."); sys.exit(1)
+    if run_gh_api_command("user") is None: print("[FATAL ERROR] Not logged in to GitHub. Please run 'gh auth login' or set GITHUB_TOKEN."); sys.exit(1)
 
     print("--- FEX-Emu Remote Build Trigger ---")
     username = input("Enter your GitHub username: ")
     fork_name = input("Enter the name of your forked FEX repository (usually 'FEX'): ")
     repo_path, build_branch = f"{username}/{fork_name}", "ci-test"
+    ledger = BuildLedger(repo_path) if client else None
 
     print("\nFetching all tags from the official FEX-Emu repository...")
-    tags_data = run_gh_api_command("/repos/FEX-Emu/FEX/tags?per_page=100")
+    tags_data = fetch_all_pages("/repos/FEX-Emu/FEX/tags")
     if tags_data is None: sys.exit(1)
     all_tags = {tag['name']: tag['commit']['sha'] for tag in tags_data if tag['name'].startswith('FEX-')}
     
@@ -75,17 +152,33 @@ def main():
 
         if choice == '1':
             tags_to_build = sorted([t for t in all_tags.keys() if t >= MINIMUM_COMPATIBLE_TAG])
-            print(f"\nFound {len(tags_to_build)} compatible tags to build.")
-            for tag_name in tags_to_build:
-                success = trigger_build(repo_path, build_branch, tag_name, all_tags[tag_name], custom_files)
-                if success: print(f"    Waiting 30 seconds before next tag..."); time.sleep(30)
+            print(f"\nFound {len(tags_to_build)} compatible tags.")
+            if ledger and not args.force:
+                print("Checking your fork's previous builds...")
+                try: ledger.sync(client, WORKFLOW_FILE, RUN_TITLE_PATTERN, f"?branch={build_branch}")
+                except GitHubError as e: print(f"[WARN] Could not read the workflow runs, building every tag: {e}")
+                skipped = [t for t in tags_to_build if not ledger.needs_build(t, all_tags[t])]
+                tags_to_build = [t for t in tags_to_build if t not in skipped]
+                if skipped: print(f"Skipping {len(skipped)} tag(s) already built or in progress: {', '.join(skipped)}")
+                print(f"{len(tags_to_build)} tag(s) left to build.")
+            if client:
+                # The API client paces the calls from the rate-limit headers, no fixed waits needed.
+                dispatcher = Dispatcher(args.concurrency)
+                results = dispatcher.run([(tag_name, lambda tag_name=tag_name: trigger_build(repo_path, build_branch, tag_name, all_tags[tag_name], custom_files, dispatcher, ledger))
+                                          for tag_name in tags_to_build])
+                failed = [tag_name for tag_name, success in results.items() if not success]
+                if failed: print(f"\n[WARN] Could not trigger: {', '.join(failed)}")
+            else:
+                for tag_name in tags_to_build:
+                    success = trigger_build(repo_path, build_branch, tag_name, all_tags[tag_name], custom_files)
+                    if success: print(f"    Waiting 30 seconds before next tag..."); time.sleep(30)
             print("\nAll build workflows have been triggered.")
             
         elif choice == '2':
             tag_input = input("Enter the specific tag to build (e.g., FEX-2508): ").strip()
             if tag_input not in all_tags: print(f"[ERROR] Tag '{tag_input}' not found.")
             elif tag_input < MINIMUM_COMPATIBLE_TAG: print(f"[ERROR] Tag '{tag_input}' is too old. Please choose {MINIMUM_COMPATIBLE_TAG} or newer.")
-            else: trigger_build(repo_path, build_branch, tag_input, all_tags[tag_input], custom_files)
+            else: trigger_build(repo_path, build_branch, tag_input, all_tags[tag_input], custom_files, ledger=ledger)
         
         elif choice == '3':
             commit_input = input("Enter a commit hash or type 'main' for the latest nightly build: ").strip()
@@ -94,7 +187,7 @@ def main():
                 main_branch_info = run_gh_api_command("/repos/FEX-Emu/FEX/branches/main")
                 if main_branch_info:
                     commit_sha = main_branch_info["commit"]["sha"]
-                    trigger_build(repo_path, build_branch, f"main-{commit_sha[:7]}", commit_sha, custom_files)
+                    trigger_build(repo_path, build_branch, f"main-{commit_sha[:7]}", commit_sha, custom_files, ledger=ledger)
             else:
                 #  resolve the user's short 7 character hash to the full 40-character SHA.
                 if len(commit_input) < 7:
@@ -108,7 +201,7 @@ def main():
                         full_commit_sha = commit_info["sha"]
                         print(f"Found full commit: {full_commit_sha}")
                         # pass the full hash to our trigger function.
-                        trigger_build(repo_path, build_branch, f"main-{commit_input[:7]}", full_commit_sha, custom_files)
+                        trigger_build(repo_path, build_branch, f"main-{commit_input[:7]}", full_commit_sha, custom_files, ledger=ledger)
                     else:
                         print(f"[ERROR] Could not find commit matching '{commit_input}' in the official repository.")
 
@@ -0,0 +1,162 @@
+# Verifies and inspects .wcp packages by stream-decoding them, nothing is extracted to disk.
+# Run with: python -m scripts.verify <command> --help
+
+import os, re, sys, json, struct, hashlib, tarfile, argparse
+from concurrent.futures import ProcessPoolExecutor
+import zstandard as zstd
+
+from . import components
+from .archive import is_pe_name, wcp_files
+
+CHUNK_SIZE = 1024 * 1024
+PE_HEADER_LIMIT = 64 * 1024 # Real DLLs put their PE header within the first few hundred bytes
+
+# IMAGE_FILE_HEADER.Machine values. ARM64EC DLLs declare x64 here, ARM64X ones arm64.
+PE_MACHINES = {0x14c: "i386", 0x8664: "x64", 0xaa64: "arm64", 0x1c4: "arm"}
+
+# What Winlator expects in each install folder, unless the component spec sets its own 'machines'.
+DEFAULT_MACHINES = {"system32": ["x64"], "syswow64": ["i386"]}
+
+def pe_machine(head):
+    """Returns the machine name from the start of a PE file, raises ValueError if it is not one."""
+    if len(head) < 0x40 or head[:2] != b"MZ": raise ValueError("no MZ header")
+    offset = struct.unpack_from("<I", head, 0x3c)[0]
+    if head[offset:offset + 4] != b"PE\0\0": raise ValueError("no PE signature")
+    if len(head) < offset + 6: raise ValueError("truncated PE header")
+    machine = struct.unpack_from("<H", head, offset + 4)[0]
+    return PE_MACHINES.get(machine, hex(machine))
+
+def expected_machines(profile_type):
+    """Returns {install folder: allowed machine names} for a profile type."""
+    for spec in components.COMPONENTS:
+        if spec["type"] == profile_type and "machines" in spec: return spec["machines"]
+    return DEFAULT_MACHINES
+
+def _scan_member(fileobj, name, with_hashes):
+    # Reads only the PE header, unless the whole member has to be hashed.
+    entry = {}
+    head = fileobj.read(4096)
+    if is_pe_name(name):
+        if len(head) >= 0x40 and head[:2] == b"MZ":
+            needed = struct.unpack_from("<I", head, 0x3c)[0] + 6
+            if len(head) < needed <= PE_HEADER_LIMIT: head += fileobj.read(needed - len(head))
+        try: entry["machine"] = pe_machine(head)
+        except ValueError as e: entry["pe_error"] = str(e)
+    if with_hashes:
+        digest = hashlib.sha256(head)
+        for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""): digest.update(chunk)
+        entry["sha256"] = digest.hexdigest()
+    return entry
+
+def scan_wcp(wcp_path, with_hashes=False):
+    """Stream-decodes a .wcp once, returns its parsed profile.json (None if absent) and {name: member entry}."""
+    profile, members = None, {}
+    with open(wcp_path, 'rb') as f:
+        with zstd.ZstdDecompressor().stream_reader(f) as reader:
+            with tarfile.open(fileobj=reader, mode='r|') as tar:
+                for info in tar:
+                    name = info.name[2:] if info.name.startswith('./') else info.name
+                    entry = {"type": "dir" if info.isdir() else "file" if info.isreg() else "other", "size": info.size}
+                    if info.isreg():
+                        fileobj = tar.extractfile(info)
+                        if name == "profile.json":
+                            data = fileobj.read()
+                            if with_hashes: entry["sha256"] = hashlib.sha256(data).hexdigest()
+                            profile = json.loads(data)
+                        else: entry.update(_scan_member(fileobj, name, with_hashes))
+                    members[name] = entry
+    return profile, members
+
+def _check(profile, members):
+    # Returns the list of problems found in an already scanned package.
+    errors = []
+    for name in members:
+        if name.startswith('/') or '..' in name.split('/'): errors.append(f"unsafe member path '{name}'")
+    if profile is None: return errors + ["no profile.json"]
+    for field in ("type", "versionName", "versionCode", "files"):
+        if field not in profile: errors.append(f"profile.json has no '{field}'")
+    files = profile.get("files") or []
+    machines = expected_machines(profile.get("type"))
+
+    listed = set()
+    for entry in files:
+        source, target = entry.get("source", ""), entry.get("target", "")
+        listed.add(source)
+        member = members.get(source)
+        if member is None or member["type"] != "file": errors.append(f"'{source}' is listed in profile.json but missing"); continue
+        if "pe_error" in member: errors.append(f"'{source}' is not a valid PE file ({member['pe_error']})"); continue
+        folder = re.match(r'\$\{(\w+)\}', target)
+        allowed = machines.get(folder.group(1)) if folder else None
+        if allowed and "machine" in member and member["machine"] not in allowed:
+            errors.append(f"'{source}' is {member['machine']}, expected {' or '.join(allowed)} for {folder.group(1)}")
+
+    for name, member in members.items():
+        if member["type"] == "file" and is_pe_name(name) and name not in listed: errors.append(f"'{name}' is not listed in profile.json")
+    return errors
+
+def verify_wcp(wcp_path, with_hashes=False):
+    """Scans and checks one .wcp, returns a result dict (also used as the JSON report entry)."""
+    result = {"wcp": os.path.basename(wcp_path), "size": os.path.getsize(wcp_path)}
+    try: profile, members = scan_wcp(wcp_path, with_hashes)
+    except (OSError, tarfile.TarError, zstd.ZstdError, ValueError) as e:
+        return {**result, "ok": False, "errors": [f"could not be decoded: {e}"]}
+    errors, profile = _check(profile, members), profile or {}
+    result.update({"ok": not errors, "errors": errors, "type": profile.get("type"), "versionName": profile.get("versionName"), "files": len(profile.get("files") or [])})
+    if with_hashes: result["members"] = members
+    return result
+
+def verify_all(paths, jobs=0, with_hashes=False):
+    """Verifies every .wcp under paths across a process pool, yielding results in input order."""
+    wcp_paths = list(wcp_files(paths))
+    workers = min(jobs if jobs > 0 else (os.cpu_count() or 1), len(wcp_paths)) or 1
+    if workers == 1:
+        for wcp_path in wcp_paths: yield verify_wcp(wcp_path, with_hashes)
+        return
+    # Each worker holds at most one package's member table, so memory stays bounded however many files there are.
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(verify_wcp, wcp_paths, [with_hashes] * len(wcp_paths))
+
+def _print_inspection(wcp_path, with_hashes):
+    profile, members = scan_wcp(wcp_path, with_hashes)
+    print(f"{os.path.basename(wcp_path)}:")
+    print(json.dumps(profile, indent=4) if profile else "  (no profile.json)")
+    for name, member in members.items():
+        if member["type"] == "dir": continue
+        details = member.get("machine") or member.get("pe_error") or ""
+        print(f"  {name:<40} {member['size']:>12,} {details:<10} {member.get('sha256', '')}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verify or inspect .wcp packages without extracting them.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    verify = commands.add_parser("verify", help="Check profile.json against the members and the PE architecture of every DLL.")
+    verify.add_argument("paths", nargs="*", default=["_wcp_output"], help=".wcp files or folders of them (default: ./_wcp_output).")
+    verify.add_argument("-j", "--jobs", type=int, default=0, help="Packages verified in parallel (default: one per CPU core).")
+    verify.add_argument("--hashes", action="store_true", help="Also record the SHA-256 and size of every member in the report.")
+    verify.add_argument("--report", help="Write the results to this JSON file.")
+    inspect = commands.add_parser("inspect", help="Print the profile.json and member list of packages.")
+    inspect.add_argument("paths", nargs="+")
+    inspect.add_argument("--hashes", action="store_true", help="Also print the SHA-256 of every member.")
+    args = parser.parse_args(argv)
+
+    if args.command == "inspect":
+        for wcp_path in wcp_files(args.paths):
+            try: _print_inspection(wcp_path, args.hashes)
+            except (OSError, tarfile.TarError, zstd.ZstdError, ValueError) as e: print(f"[ERROR] Could not read {wcp_path}: {e}")
+        return
+
+    results = []
+    for result in verify_all(args.paths, args.jobs, args.hashes):
+        results.append(result)
+        if result["ok"]: print(f"[OK] {result['wcp']} ({result['type']} {result['versionName']}, {result['files']} file(s))")
+        else:
+            print(f"[FAIL] {result['wcp']}")
+            for error in result["errors"]: print(f"   -> {error}")
+    failed = sum(1 for result in results if not result["ok"])
+    print(f"\nVerified {len(results)} package(s), {failed} failed.")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f: json.dump(results, f, indent=4)
+        print(f"Results written to {args.report}")
+    if failed or not results: sys.exit(1)
+
+if __name__ == "__main__":
+    main()
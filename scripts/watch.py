@@ -0,0 +1,86 @@
+# Folder watchers for the batch converter's watch mode: inotify on Linux, polling everywhere else.
+
+import os, time, errno, select, struct, ctypes, ctypes.util
+
+# inotify event flags, from <sys/inotify.h>
+IN_CLOSE_WRITE, IN_MOVED_TO, IN_CREATE = 0x00000008, 0x00000080, 0x00000100
+_EVENT_HEADER = struct.Struct("iIII") # wd, mask, cookie, name length
+
+class InotifyWatcher:
+    """Reports file names created, closed after writing or moved into a folder, via Linux inotify."""
+    kind = "inotify"
+
+    def __init__(self, folder):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        if not hasattr(libc, "inotify_init1"): raise OSError(errno.ENOSYS, "inotify is not available")
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0: raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self._fd, os.fsencode(folder), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE) < 0:
+            err = ctypes.get_errno(); os.close(self._fd)
+            raise OSError(err, f"Could not watch {folder}")
+
+    def poll(self, timeout):
+        """Waits up to timeout seconds and returns the set of file names that changed."""
+        names = set()
+        if not select.select([self._fd], [], [], timeout)[0]: return names
+        try: data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError: return names
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name: names.add(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self._fd)
+
+class PollingWatcher:
+    """Fallback for systems without inotify (or shared storage that does not emit events): lists the folder every interval."""
+    kind = "polling"
+
+    def __init__(self, folder, interval=2.0):
+        self.folder, self.interval = folder, interval
+        self._last_poll = 0.0
+
+    def poll(self, timeout):
+        # Only list the folder once per interval, however often we are asked.
+        wait = self._last_poll + self.interval - time.monotonic()
+        if wait > 0: time.sleep(min(wait, timeout))
+        if time.monotonic() < self._last_poll + self.interval: return set()
+        self._last_poll = time.monotonic()
+        try: return set(os.listdir(self.folder))
+        except OSError: return set()
+
+    def close(self): pass
+
+def open_watcher(folder, force_polling=False, interval=2.0):
+    """Returns an inotify watcher when possible, otherwise a polling one."""
+    if not force_polling:
+        try: return InotifyWatcher(folder)
+        except (OSError, AttributeError): pass
+    return PollingWatcher(folder, interval)
+
+class StabilityTracker:
+    """Debounces new files: a path is ready once its size and mtime stayed the same for `settle` seconds."""
+
+    def __init__(self, settle=3.0):
+        self.settle, self._pending = settle, {} # path -> (size, mtime, time first seen with that state)
+
+    def add(self, path):
+        self._pending.setdefault(path, (None, None, time.monotonic()))
+
+    def __len__(self):
+        return len(self._pending)
+
+    def ready(self):
+        """Returns (and forgets) every path that is now fully written; paths that vanished are dropped."""
+        now, ready = time.monotonic(), []
+        for path, (size, mtime, since) in list(self._pending.items()):
+            try: stat = os.stat(path)
+            except OSError: del self._pending[path]; continue
+            if (stat.st_size, stat.st_mtime) != (size, mtime): self._pending[path] = (stat.st_size, stat.st_mtime, now)
+            elif now - since >= self.settle: ready.append(path); del self._pending[path]
+        return ready
@@ -0,0 +1,65 @@
+# Shared fixtures: a local HTTP server standing in for the GitHub API and artifact storage.
+
+import os, sys, json, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args): pass
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        request = {"method": self.command, "path": self.path, "headers": {k.lower(): v for k, v in self.headers.items()}, "body": body}
+        self.server.requests.append(request)
+        status, headers, data = self.server.app(request)
+        if isinstance(data, (dict, list)): data, headers = json.dumps(data).encode('utf-8'), {"Content-Type": "application/json", **headers}
+        data = data or b""
+        self.send_response(status)
+        for key, value in headers.items(): self.send_header(key, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        # cut(request) -> True sends half of the body, then drops the connection.
+        if self.server.cut and self.server.cut(request):
+            self.wfile.write(data[:len(data) // 2]); self.wfile.flush()
+            self.close_connection = True; return
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = _handle
+
+class StubServer:
+    """Serves app(request) -> (status, headers, body); body may be bytes or JSON data. Records every request."""
+
+    def __init__(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.requests, self._server.app, self._server.cut = [], lambda request: (404, {}, {"message": "Not Found"}), None
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    @property
+    def requests(self): return self._server.requests
+
+    def route(self, app, cut=None):
+        self._server.app, self._server.cut = app, cut
+
+    def close(self):
+        self._server.shutdown(); self._server.server_close()
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    yield server
+    server.close()
+
+def range_response(data, request):
+    """Answers a request for data the way blob storage does, honouring its Range header."""
+    spec = request["headers"].get("range", "")
+    if not spec.startswith("bytes="): return 200, {}, data
+    start, _, end = spec[len("bytes="):].partition("-")
+    start, end = int(start), min(int(end) if end else len(data) - 1, len(data) - 1)
+    return 206, {"Content-Range": f"bytes {start}-{end}/{len(data)}"}, data[start:end + 1]
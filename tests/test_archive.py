@@ -0,0 +1,20 @@
+import io, os, stat, zipfile
+
+import pytest
+
+from scripts import archive
+
+def test_written_wcp_gets_default_file_mode(tmp_path, monkeypatch):
+    # mkstemp's 0600 must not survive the rename to the final .wcp name.
+    monkeypatch.setattr(archive, "_UMASK", 0o027)
+    output_path = str(tmp_path / "out.wcp")
+    archive.transcode_to_wcp([], output_path, {}, {}, {"type": "DXVK", "files": []})
+    assert stat.S_IMODE(os.stat(output_path).st_mode) == 0o640
+
+def test_zip_without_any_wanted_member_writes_nothing(tmp_path):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zip_ref: zip_ref.writestr("holiday/photo.jpg", b"jpeg")
+    output_path = str(tmp_path / "out.wcp")
+    with zipfile.ZipFile(buffer) as zip_ref, pytest.raises(ValueError):
+        archive.transcode_zip_to_wcp(zip_ref, output_path, {"x64": "system32"}, {"system32": ["d3d11"]}, {"type": "DXVK", "files": []})
+    assert os.listdir(tmp_path) == []
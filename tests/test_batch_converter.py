@@ -0,0 +1,51 @@
+import multiprocessing
+
+import pytest
+
+import batch_converter
+from scripts import components, engine, metrics
+
+class _MissCache:
+    def lookup(self, key, dest_dir): return None
+    def store(self, key, output_path): pass
+
+def _jobs(tmp_path, count):
+    spec, jobs = components.get("dxvk"), []
+    for i in range(count):
+        path = tmp_path / f"dxvk-2.{i}.tar.gz"; path.write_bytes(b"source %d" % i)
+        jobs.append((spec["label"], spec, str(path), {}))
+    return jobs
+
+@pytest.fixture
+def report():
+    metrics.enable(True)
+    yield metrics.RunReport([])
+    metrics.enable(False)
+
+def test_cache_miss_timing_is_carried_into_the_conversion_record(tmp_path, monkeypatch, report):
+    monkeypatch.setattr(engine, "convert", lambda spec, full_path, **options: None)
+    jobs = _jobs(tmp_path, 2)
+    batch_converter.run_jobs(jobs, 1, cache=_MissCache(), report=report)
+    assert [record["source"] for record in report.records] == ["dxvk-2.0.tar.gz", "dxvk-2.1.tar.gz"]
+    assert all("cache_lookup" in record["stages"] for record in report.records)
+    assert all(record["converter"] == "dxvk" and record["wall_s"] >= record["stages"]["cache_lookup"] for record in report.records)
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="the patched converter must reach the workers")
+def test_worker_failure_gets_its_own_record(tmp_path, monkeypatch, report):
+    def crash(spec, full_path, **options): raise RuntimeError("worker died")
+    monkeypatch.setattr(engine, "convert", crash)
+    jobs = _jobs(tmp_path, 3)
+    results = batch_converter.run_jobs(jobs, 2, cache=_MissCache(), report=report)
+    assert set(results.values()) == {None}
+    # One record per source, not the last cache lookup's record ended three times.
+    assert sorted(record["source"] for record in report.records) == ["dxvk-2.0.tar.gz", "dxvk-2.1.tar.gz", "dxvk-2.2.tar.gz"]
+    assert all(record["status"] == "failed" and "cache_lookup" in record["stages"] for record in report.records)
+
+def test_unrecognized_zips_are_listed_and_can_be_typed(tmp_path):
+    for name in ("dxvk-master.zip", "d3d11-async.zip", "notes.txt"): (tmp_path / name).write_bytes(b"")
+    files = sorted(path.name for path in tmp_path.iterdir())
+    assert [job[2] for job in batch_converter.find_jobs(str(tmp_path), files)] == [str(tmp_path / "dxvk-master.zip")]
+    assert batch_converter.unmatched_archives(str(tmp_path), files) == ["d3d11-async.zip"]
+    typed = batch_converter.find_jobs(str(tmp_path), files, "dxvk-dev")
+    assert [(job[1]["name"], job[2]) for job in typed] == [("dxvk-dev", str(tmp_path / "d3d11-async.zip")), ("dxvk-dev", str(tmp_path / "dxvk-master.zip"))]
+    assert batch_converter.unmatched_archives(str(tmp_path), files, "dxvk-dev") == []
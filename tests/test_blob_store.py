@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+from scripts import components, engine, synthetic_inputs
+from scripts.blob_store import BlobStore
+
+def test_rebuild_is_byte_identical_to_the_ingested_wcp(tmp_path):
+    store = BlobStore(str(tmp_path / "store"))
+    packages = []
+    for version in ("2.3", "2.3.1"): # Two releases sharing most of their DLLs
+        source = synthetic_inputs.make_dxvk_release(str(tmp_path), version, dll_count=3, dll_size=16 * 1024)
+        packages.append(engine.convert(components.get("dxvk"), source, interactive=False))
+    for wcp_path in packages: store.ingest(wcp_path)
+    assert store.stats()["dedupe_ratio"] > 1.9 # Only the two profile.json files differ
+    (tmp_path / "rebuilt").mkdir()
+
+    for wcp_path in packages:
+        name = wcp_path.rsplit("/", 1)[-1][:-len(".wcp")]
+        rebuilt = store.rebuild(name, str(tmp_path / "rebuilt" / f"{name}.wcp"))
+        with open(rebuilt, 'rb') as a, open(wcp_path, 'rb') as b: assert a.read() == b.read()
+
+def test_interrupted_rebuild_leaves_no_wcp(tmp_path, monkeypatch):
+    store = BlobStore(str(tmp_path / "store"))
+    source = synthetic_inputs.make_dxvk_release(str(tmp_path), dll_count=2, dll_size=4096)
+    store.ingest(engine.convert(components.get("dxvk"), source, interactive=False))
+    monkeypatch.setattr(store, "open_blob", lambda digest: (_ for _ in ()).throw(OSError("blob missing")))
+    (tmp_path / "rebuilt").mkdir()
+    with pytest.raises(OSError): store.rebuild("dxvk-2.3", str(tmp_path / "rebuilt" / "dxvk-2.3.wcp"))
+    assert os.listdir(tmp_path / "rebuilt") == []
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from scripts import trigger_fex_builds
+from scripts.build_ledger import BuildLedger
+from scripts.github_api import GitHubClient
+
+REPO = "me/FEX"
+
+def _run(run_id, ref, status="completed", conclusion="success"):
+    return {"id": run_id, "display_title": f"Build: Prepare FEX tag {ref}", "created_at": "2026-01-01T00:00:00Z",
+            "status": status, "conclusion": conclusion, "head_sha": f"build{run_id}"}
+
+class FakeGitHub:
+    """Just enough of the git data and Actions API of a FEX fork for trigger_build and BuildLedger.sync."""
+
+    def __init__(self, stub_server):
+        self.runs, self.artifacts, self.stale_trees = [], {}, set()
+        self.head, self.trees, self.commits = None, 0, 0
+        stub_server.route(self.app)
+
+    def app(self, request):
+        method, path = request["method"], request["path"].split("?")[0]
+        body = json.loads(request["body"]) if request["body"] else None
+        if path.startswith("/repos/FEX-Emu/FEX/git/trees/"): return 200, {}, {"sha": "base-tree"}
+        if (method, path) == ("POST", f"/repos/{REPO}/git/trees"):
+            self.trees += 1; return 201, {}, {"sha": f"tree{self.trees}"}
+        if (method, path) == ("POST", f"/repos/{REPO}/git/commits"):
+            if body["tree"] in self.stale_trees: return 422, {}, {"message": "Tree SHA does not exist"}
+            self.commits += 1; return 201, {}, {"sha": f"commit{self.commits}"}
+        if path == f"/repos/{REPO}/git/ref/heads/ci-test": return 200, {}, {"object": {"sha": self.head}}
+        if (method, path) == ("PATCH", f"/repos/{REPO}/git/refs/heads/ci-test"):
+            self.head = body["sha"]; return 200, {}, {"object": {"sha": self.head}}
+        if path.endswith("/actions/workflows/Compile-FEXCore.yml/runs"): return 200, {}, {"workflow_runs": self.runs}
+        if path.startswith(f"/repos/{REPO}/actions/runs/"): return 200, {}, {"artifacts": self.artifacts.get(int(path.split("/")[-2]), [])}
+        return 404, {}, {"message": "Not Found"}
+
+@pytest.fixture
+def github(stub_server, monkeypatch):
+    monkeypatch.setattr(trigger_fex_builds, "client", GitHubClient(stub_server.url, token="t", cache_dir=None, write_interval=0))
+    return FakeGitHub(stub_server)
+
+@pytest.fixture
+def ledger(tmp_path):
+    return BuildLedger(REPO, str(tmp_path / "ledger.json"))
+
+CUSTOM_FILES = {".github/workflows/Compile-FEXCore.yml": {"path": ".github/workflows/Compile-FEXCore.yml", "mode": "100644", "type": "blob", "sha": "wf"}}
+
+def _sync(ledger):
+    return ledger.sync(trigger_fex_builds.client, "Compile-FEXCore.yml", trigger_fex_builds.RUN_TITLE_PATTERN, "?branch=ci-test")
+
+def test_sync_marks_built_refs_and_leaves_the_rest_to_build(github, ledger):
+    github.runs = [_run(1, "FEX-2507"), _run(2, "FEX-2508", conclusion="failure"), _run(3, "FEX-2509", status="in_progress", conclusion=None),
+                   _run(4, "FEX-2510"), {**_run(5, "FEX-2507"), "created_at": "2025-12-01T00:00:00Z", "conclusion": "failure"}]
+    github.artifacts = {1: [{"name": "FEXCore", "expired": False}], 4: [{"name": "FEXCore", "expired": True}]}
+    _sync(ledger)
+    assert ledger.entry("FEX-2507")["run_id"] == 1 # The newest run of a ref wins
+    assert not ledger.needs_build("FEX-2507") and not ledger.needs_build("FEX-2509")
+    assert ledger.needs_build("FEX-2508") and ledger.needs_build("FEX-2510") and ledger.needs_build("FEX-2511")
+    # The ledger survives a restart.
+    assert not BuildLedger(REPO, ledger.path).needs_build("FEX-2507")
+
+def test_second_trigger_of_a_built_ref_is_skipped(github, ledger):
+    assert trigger_fex_builds.trigger_build(REPO, "ci-test", "FEX-2507", "abc1234", CUSTOM_FILES, ledger=ledger)
+    assert not ledger.needs_build("FEX-2507", "abc1234") # Pending while its run has not shown up yet
+    github.runs, github.artifacts = [{**_run(1, "FEX-2507"), "created_at": "2099-01-01T00:00:00Z"}], {1: [{"name": "FEXCore"}]}
+    _sync(ledger)
+    assert ledger.entry("FEX-2507")["status"] == "success"
+    assert not ledger.needs_build("FEX-2507", "abc1234")
+    assert ledger.needs_build("FEX-2507", "def5678") # The tag was moved to another commit
+
+def test_trigger_reuses_the_cached_merged_tree(github, ledger):
+    assert trigger_fex_builds.trigger_build(REPO, "ci-test", "FEX-2507", "abc1234", CUSTOM_FILES, ledger=ledger)
+    assert (github.trees, github.commits, github.head) == (1, 1, "commit1")
+    # The branch already points at the cached commit, so only a fresh commit of the cached tree is made.
+    assert trigger_fex_builds.trigger_build(REPO, "ci-test", "FEX-2507", "abc1234", CUSTOM_FILES, ledger=ledger)
+    assert (github.trees, github.commits, github.head) == (1, 2, "commit2")
+    key = trigger_fex_builds.merged_tree_key("FEX-2507", "abc1234", CUSTOM_FILES)
+    assert ledger.cached_tree(key)["commit"] == "commit2"
+
+def test_trigger_forgets_a_stale_cached_tree(github, ledger):
+    assert trigger_fex_builds.trigger_build(REPO, "ci-test", "FEX-2507", "abc1234", CUSTOM_FILES, ledger=ledger)
+    github.stale_trees.add("tree1") # Garbage collected by GitHub since
+    assert trigger_fex_builds.trigger_build(REPO, "ci-test", "FEX-2507", "abc1234", CUSTOM_FILES, ledger=ledger)
+    key = trigger_fex_builds.merged_tree_key("FEX-2507", "abc1234", CUSTOM_FILES)
+    assert ledger.cached_tree(key)["tree"] == "tree2" and github.trees == 2
+    assert github.head == ledger.cached_tree(key)["commit"] == ledger.entry("FEX-2507")["build_commit"]
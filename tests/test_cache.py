@@ -0,0 +1,54 @@
+import os
+
+import batch_converter
+from scripts import components, engine, synthetic_inputs
+from scripts.cache import ConversionCache, cache_key
+
+def _key(source, spec, compression="default", options=None):
+    return cache_key(source, spec["name"], compression=compression, reproducible=False, options=options or {}, spec=spec)
+
+def test_key_changes_with_input_options_and_profile(tmp_path):
+    spec = components.get("dxvk")
+    source = synthetic_inputs.make_dxvk_release(str(tmp_path), dll_count=2, dll_size=4096)
+    key = _key(source, spec)
+    assert _key(source, spec) == key
+    assert _key(source, spec, compression="release") != key
+    assert _key(source, spec, options={"version_name": "2.3-async"}) != key
+    assert _key(source, {**spec, "dlls": {"system32": ["d3d11"]}}) != key # Editing the component table
+    with open(source, 'ab') as f: f.write(b"\0")
+    assert _key(source, spec) != key
+
+def test_store_and_lookup_round_trip(tmp_path):
+    cache = ConversionCache(str(tmp_path / "cache"))
+    spec = components.get("dxvk")
+    source = synthetic_inputs.make_dxvk_release(str(tmp_path), dll_count=2, dll_size=4096)
+    output_path = engine.convert(spec, source, interactive=False)
+    key = _key(source, spec)
+    assert cache.lookup(key, str(tmp_path)) is None
+    cache.store(key, output_path)
+    (tmp_path / "elsewhere").mkdir()
+    # A fresh instance reads the index written by the first one.
+    hit = ConversionCache(str(tmp_path / "cache")).lookup(key, str(tmp_path / "elsewhere"))
+    assert hit == str(tmp_path / "elsewhere" / "dxvk-2.3.wcp")
+    with open(hit, 'rb') as a, open(output_path, 'rb') as b: assert a.read() == b.read()
+    assert cache.index[key]["profile"]["versionName"] == "2.3"
+
+def test_batch_run_only_converts_on_a_miss(tmp_path, monkeypatch):
+    converted = []
+    real_convert = engine.convert
+    monkeypatch.setattr(engine, "convert", lambda spec, full_path, **options: converted.append(full_path) or real_convert(spec, full_path, **options))
+    cache = ConversionCache(str(tmp_path / "cache"))
+    folder = tmp_path / "in"; folder.mkdir()
+    synthetic_inputs.make_dxvk_release(str(folder), dll_count=2, dll_size=4096)
+
+    def run(compression="default"):
+        converted.clear()
+        jobs = batch_converter.find_jobs(str(folder), os.listdir(folder))
+        results = batch_converter.run_jobs(jobs, 1, cache, compression)
+        for output_path in results.values(): os.remove(output_path)
+        return len(converted)
+
+    assert run() == 1
+    assert run() == 0 # Same input and options: served from the cache
+    assert run("fast") == 1 # Another compression profile
+    assert run("fast") == 0
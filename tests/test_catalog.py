@@ -0,0 +1,35 @@
+import os, stat
+
+from scripts import archive
+from scripts.catalog import Catalog
+
+def test_saved_catalog_gets_default_file_mode(tmp_path, monkeypatch):
+    # Mirrors serving the folder must be able to read catalog.json, not just its owner.
+    monkeypatch.setattr(archive, "_UMASK", 0o022)
+    catalog = Catalog(str(tmp_path))
+    catalog.save()
+    assert stat.S_IMODE(os.stat(catalog.path).st_mode) == 0o644
+
+def _catalog(tmp_path, packages):
+    catalog = Catalog(str(tmp_path))
+    catalog.packages = {filename: {"type": "DXVK", "dlls": ["d3d11"], "description": None, **entry} for filename, entry in packages.items()}
+    return catalog
+
+def test_latest_prefers_the_newest_release_over_dev_builds(tmp_path):
+    catalog = _catalog(tmp_path, {
+        "dxvk-2.9.wcp": {"versionName": "2.9", "versionCode": 0},
+        "dxvk-2.10.wcp": {"versionName": "2.10", "versionCode": 0},
+        "dxvk-master-8f0583d-20240305.wcp": {"versionName": "master-8f0583d", "versionCode": 20240305},
+        "dxvk-gplasync-1a2b3c4-20250101.wcp": {"versionName": "gplasync-1a2b3c4", "versionCode": 20250101},
+    })
+    assert [name for name, _ in catalog.query()] == ["dxvk-2.10.wcp", "dxvk-2.9.wcp", "dxvk-gplasync-1a2b3c4-20250101.wcp", "dxvk-master-8f0583d-20240305.wcp"]
+    assert catalog.query(latest=True)[0][0] == "dxvk-2.10.wcp"
+    # Among dev builds alone, the newest build date wins.
+    assert catalog.query(match="-20", latest=True)[0][0] == "dxvk-gplasync-1a2b3c4-20250101.wcp"
+
+def test_query_filters_by_type_text_and_dll(tmp_path):
+    catalog = _catalog(tmp_path, {"dxvk-2.3.wcp": {"versionName": "2.3", "versionCode": 0},
+                                  "vkd3d-proton-2.11.wcp": {"type": "VKD3D", "versionName": "2.11", "versionCode": 0, "dlls": ["d3d12"]}})
+    assert [name for name, _ in catalog.query(profile_type="vkd3d")] == ["vkd3d-proton-2.11.wcp"]
+    assert [name for name, _ in catalog.query(dll="D3D11.dll")] == ["dxvk-2.3.wcp"]
+    assert [name for name, _ in catalog.query(match="2.3")] == ["dxvk-2.3.wcp"]
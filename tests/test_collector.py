@@ -0,0 +1,96 @@
+import io, os, json, tarfile, zipfile
+import zstandard as zstd
+
+from conftest import range_response
+from scripts import collector, components, engine
+from scripts.build_ledger import BuildLedger
+from scripts.github_api import GitHubClient
+from scripts.verify import scan_wcp
+
+def _zip(members, compression=zipfile.ZIP_STORED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression) as zip_ref:
+        for name, data in members.items(): zip_ref.writestr(name, data)
+    return buffer.getvalue()
+
+def _serve(stub_server, data, cut=None):
+    stub_server.route(lambda request: range_response(data, request), cut)
+    return lambda: f"{stub_server.url}/blob?sig=1"
+
+def test_remote_file_reads_across_block_boundaries(stub_server):
+    members = {"a.bin": os.urandom(300), "Box64_WCP/box64": os.urandom(5000), "Box64_WCP/profile.json": b"{}"}
+    data = _zip(members)
+    for block_size in (7, 64, 1000, 4096):
+        with collector.RemoteFile(_serve(stub_server, data), len(data), block_size=block_size) as remote, zipfile.ZipFile(remote) as zip_ref:
+            assert {name: zip_ref.read(name) for name in zip_ref.namelist()} == members
+
+def test_remote_file_member_header_straddles_block(stub_server):
+    first = os.urandom(1000)
+    data = _zip({"first.bin": first, "second.bin": b"x" * 100})
+    # The block fetched for the local header of first.bin (at 0) ends 11 bytes
+    # into the 30-byte local header of second.bin (at 30 + 9 + 1000).
+    with collector.RemoteFile(_serve(stub_server, data), block_size=1050) as remote, zipfile.ZipFile(remote) as zip_ref:
+        assert zip_ref.read("first.bin") == first
+        assert zip_ref.read("second.bin") == b"x" * 100
+        assert remote.size == len(data)
+
+def test_remote_file_resumes_dropped_transfer(stub_server, monkeypatch):
+    monkeypatch.setattr(collector.time, "sleep", lambda seconds: None)
+    data = os.urandom(10000)
+    dropped = []
+    def cut(request):
+        if request["headers"].get("range") == "bytes=0-9999" and not dropped: dropped.append(request); return True
+        return False
+    with collector.RemoteFile(_serve(stub_server, data, cut), len(data)) as remote:
+        assert remote.read() == data
+        assert remote.stats["resumes"] == 1
+    # The retry only asks for what was not received yet.
+    assert stub_server.requests[-1]["headers"]["range"] == "bytes=5000-9999"
+
+def _box64_artifact(version):
+    return _zip({"box64": b"loose", f"Box64-{version}.wcp": b"ready", "Box64_WCP/box64": b"\x7fELF" + os.urandom(2000),
+                 "Box64_WCP/profile.json": json.dumps({"type": "Box64", "versionName": version, "versionCode": 0}).encode()})
+
+def test_collect_retries_a_run_whose_download_failed(stub_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(collector, "BuildLedger", lambda repo_path: BuildLedger(repo_path, str(tmp_path / "ledger.json")))
+    artifact = _box64_artifact("0.3.6")
+    zip_calls = []
+    def app(request):
+        path = request["path"].split("?")[0]
+        if path.endswith("/workflows/Compile-Box64.yml/runs"):
+            return 200, {}, {"workflow_runs": [{"id": 1, "display_title": "Build Box64 v0.3.6", "created_at": "2026-01-01T00:00:00Z",
+                                                "status": "completed", "conclusion": "success", "head_sha": "a"}]}
+        if path.endswith("/runs/1/artifacts"): return 200, {}, {"artifacts": [{"id": 10, "name": "Box64-0.3.6", "expired": False, "size_in_bytes": len(artifact)}]}
+        if path.endswith("/artifacts/10/zip"):
+            zip_calls.append(request)
+            if len(zip_calls) == 1: return 500, {}, {"message": "Server Error"} # The first download attempt fails
+            return 302, {"Location": f"{stub_server.url}/blob/10"}, b""
+        if path == "/blob/10": return range_response(artifact, request)
+        return 404, {}, {"message": "Not Found"}
+    stub_server.route(app)
+
+    client = GitHubClient(stub_server.url, token="t", cache_dir=None, max_retries=0)
+    created = collector.collect(client, components.get("box64"), "me/box64", str(tmp_path / "out"), interval=0, timeout=30)
+    assert created == [str(tmp_path / "out" / "Box64-0.3.6.wcp")]
+    profile, members = scan_wcp(created[0])
+    assert profile["versionName"] == "0.3.6" and [entry["source"] for entry in profile["files"]] == ["box64"]
+    assert set(members) == {"profile.json", "box64"}
+
+def test_transcode_zip_only_packages_the_staging_folder(tmp_path):
+    spec = components.get("box64")
+    staged = b"\x7fELF" + os.urandom(2000)
+    # A decoy top-level folder listed before the staging folder must not be picked up.
+    data = _zip({"Other/box64": b"decoy", "Box64_WCP/box64": staged, "Box64_WCP/profile.json": b"{}"})
+    output_path = str(tmp_path / "Box64-0.3.6.wcp")
+    with zipfile.ZipFile(io.BytesIO(data)) as zip_ref:
+        engine.transcode_zip(spec, zip_ref, output_path, engine.new_profile(spec, "0.3.6", 0))
+    with open(output_path, 'rb') as f, zstd.ZstdDecompressor().stream_reader(f) as reader, tarfile.open(fileobj=reader, mode='r|') as tar:
+        contents = {member.name.lstrip('./'): tar.extractfile(member).read() for member in tar if member.isreg()}
+    assert contents["box64"] == staged
+
+def test_collected_artifact_is_skipped_without_downloading(stub_server, tmp_path):
+    (tmp_path / "Box64-v0.3.6.wcp").write_bytes(b"collected before")
+    client = GitHubClient(stub_server.url, token="t", cache_dir=None, max_retries=0)
+    artifact = {"id": 10, "name": "Box64-v0.3.6", "size_in_bytes": 1000}
+    assert collector.collect_artifact(client, components.get("box64"), "me/box64", artifact, str(tmp_path)) == (str(tmp_path / "Box64-v0.3.6.wcp"), False)
+    assert stub_server.requests == []
@@ -0,0 +1,16 @@
+from scripts import components
+
+def test_match_picks_components_by_extension():
+    assert components.match("dxvk-2.3.tar.gz")["name"] == "dxvk"
+    assert components.match("vkd3d-proton-2.12.tar.zst")["name"] == "vkd3d-proton"
+    assert components.match("dxvk-master.zip")["name"] == "dxvk-dev"
+    assert components.match("DXVK-merge-8f0583d9954a.zip")["name"] == "dxvk-dev"
+
+def test_match_leaves_unrelated_zips_alone():
+    # Only DXVK dev builds are picked from a folder full of downloads; CI artifacts only ever by name.
+    for filename in ("photos.zip", "FEXCore DLLs.zip", "Box64-v0.3.6.zip", "notes.txt"):
+        assert components.match(filename) is None
+
+def test_match_with_a_component_name_ignores_the_name_pattern():
+    assert components.match("d3d11-async.zip", "dxvk-dev")["name"] == "dxvk-dev"
+    assert components.match("d3d11-async.tar.gz", "dxvk-dev") is None
@@ -0,0 +1,24 @@
+import sys, gzip, argparse
+
+import pytest
+
+from scripts import benchmark, decoders
+
+def test_process_decoder_survives_a_chatty_stderr():
+    # 1 MiB on stderr before any output: more than a pipe holds, so an unread stderr pipe would hang.
+    script = "import sys; sys.stderr.write('w' * 1024 * 1024); sys.stderr.flush(); sys.stdout.write('data')"
+    with decoders._open_process([sys.executable, "-c", script]) as stream:
+        assert stream.read() == b"data"
+
+def test_process_decoder_reports_stderr_on_failure():
+    script = "import sys; sys.stderr.write('corrupt block'); sys.exit(1)"
+    with pytest.raises(OSError, match="corrupt block"):
+        with decoders._open_process([sys.executable, "-c", script]) as stream: stream.read()
+
+def test_benchmark_decode_skips_missing_sources(tmp_path, capsys):
+    source = tmp_path / "dxvk-2.3.tar.gz"
+    source.write_bytes(gzip.compress(b"\0" * 4096))
+    args = argparse.Namespace(archives=[str(tmp_path / "missing.tar.gz"), str(source)], repeat=1, seed=0, workdir=str(tmp_path), json=None)
+    results = benchmark.cmd_decode(args)
+    assert "[ERROR] Could not decode" in capsys.readouterr().out
+    assert results and {result["archive"] for result in results} == {"dxvk-2.3.tar.gz"}
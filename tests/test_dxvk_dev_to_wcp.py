@@ -0,0 +1,24 @@
+import zipfile
+
+import pytest
+
+from scripts.dxvk_dev_to_wcp import derive_metadata
+
+def _dev_zip(path):
+    with zipfile.ZipFile(path, 'w') as zip_ref:
+        zip_ref.writestr(zipfile.ZipInfo("x64/d3d11.dll", (2024, 3, 5, 12, 0, 0)), b"MZ")
+    return str(path)
+
+@pytest.mark.parametrize("filename, version_name", [
+    ("dxvk-8f0583d9954a1b2c.zip", "master-8f0583d"),
+    ("dxvk-master-8f0583d9954a1b2c.zip", "master-8f0583d"),
+    ("dxvk-merge-8f0583d9954a1b2c.zip", "merge-8f0583d"),
+    ("dxvk-gplasync-8f0583d.zip", "gplasync-8f0583d"),
+    ("DXVK_Sarek_8f0583d9954a.zip", "sarek-8f0583d"),
+])
+def test_derive_metadata_takes_variant_and_hash_from_file_name(tmp_path, filename, version_name):
+    assert derive_metadata(_dev_zip(tmp_path / filename)) == (version_name, 20240305)
+
+def test_derive_metadata_does_not_take_a_date_for_a_hash(tmp_path):
+    assert derive_metadata(_dev_zip(tmp_path / "dxvk-master-20240305.zip")) == ("master-20240305", 20240305)
+    assert derive_metadata(_dev_zip(tmp_path / "dxvk-20240305-8f0583d.zip")) == ("master-8f0583d", 20240305)
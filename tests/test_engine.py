@@ -0,0 +1,46 @@
+import time
+
+import pytest
+
+from scripts import archive, components, engine, synthetic_inputs
+from scripts.verify import scan_wcp, verify_wcp
+
+def test_converted_release_passes_verification(tmp_path):
+    # The synthetic release also ships x64/d3d8.dll, which Winlator's DXVK profile does not install.
+    source = synthetic_inputs.make_dxvk_release(str(tmp_path), dll_count=7, dll_size=8192)
+    output_path = engine.convert(components.get("dxvk"), source, interactive=False)
+    result = verify_wcp(output_path)
+    assert result["ok"], result["errors"]
+    _, members = scan_wcp(output_path)
+    assert "system32/d3d8.dll" not in members and "syswow64/d3d8.dll" in members
+
+def test_streaming_transcoder_renames_arch_folders_and_lists_them(tmp_path):
+    source = synthetic_inputs.make_dxvk_release(str(tmp_path), dll_count=7, dll_size=8192)
+    output_path = engine.convert(components.get("dxvk"), source, interactive=False)
+    profile, members = scan_wcp(output_path)
+    files = {member for member, entry in members.items() if entry["type"] == "file" and member != "profile.json"}
+    assert {name.split('/')[0] for name in files} == {"system32", "syswow64"} # No x64/, x32/ or top-level folder left
+    assert members["system32/d3d11.dll"]["machine"] == "x64" and members["syswow64/d3d11.dll"]["machine"] == "i386"
+    dlls = components.get("dxvk")["dlls"]
+    assert profile["files"] == [{"source": f"{folder}/{dll}.dll", "target": f"${{{folder}}}/{dll}.dll"} for folder, names in dlls.items() for dll in names]
+    assert {entry["source"] for entry in profile["files"]} == files
+    assert (profile["type"], profile["versionName"]) == ("DXVK", "2.3")
+
+@pytest.fixture
+def archive_settings():
+    saved = archive.current_settings()
+    yield archive.configure
+    archive.configure(**saved)
+
+@pytest.mark.parametrize("component, make", [("dxvk", synthetic_inputs.make_dxvk_release), ("dxvk-dev", synthetic_inputs.make_dxvk_dev_build)])
+def test_reproducible_runs_give_identical_wcp(component, make, tmp_path, monkeypatch, archive_settings):
+    outputs = []
+    # Different clocks (profile.json mtime) and zstd thread counts must not show in the output.
+    for run, (clock, threads) in enumerate([(1_000_000_000.0, 0), (1_700_000_000.0, 4)]):
+        monkeypatch.setattr(time, "time", lambda clock=clock: clock)
+        archive_settings(reproducible=True, threads=threads)
+        run_dir = tmp_path / str(run); run_dir.mkdir()
+        source = make(str(run_dir), dll_count=3, dll_size=64 * 1024)
+        output_path = engine.convert(components.get(component), source, "2.3", 0, interactive=False)
+        with open(output_path, 'rb') as f: outputs.append(f.read())
+    assert outputs[0] == outputs[1]
@@ -0,0 +1,58 @@
+import time
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+
+from scripts import github_api
+from scripts.github_api import GitHubClient, GitHubError
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    waited = []
+    monkeypatch.setattr(github_api.time, "sleep", waited.append)
+    return waited
+
+def _query(request):
+    return {name: values[0] for name, values in parse_qs(urlsplit(request["path"]).query).items()}
+
+def test_paginate_fetches_every_page_announced_by_last_link(stub_server):
+    def app(request):
+        page = int(_query(request).get("page", 1))
+        link = f'<{stub_server.url}/repos/o/r/actions/runs?per_page=2&page=2>; rel="next", <{stub_server.url}/repos/o/r/actions/runs?per_page=2&page=3>; rel="last"'
+        return 200, {"Link": link} if page == 1 else {}, {"workflow_runs": [page * 10, page * 10 + 1]}
+    stub_server.route(app)
+    client = GitHubClient(stub_server.url, token="t", cache_dir=None)
+    assert client.paginate("repos/o/r/actions/runs", key="workflow_runs", per_page=2) == [10, 11, 20, 21, 30, 31]
+    assert sorted(_query(request).get("page", "1") for request in stub_server.requests) == ["1", "2", "3"]
+    assert all(_query(request)["per_page"] == "2" for request in stub_server.requests)
+
+def test_not_modified_response_reuses_the_cached_body(stub_server, tmp_path):
+    def app(request):
+        if request["headers"].get("if-none-match") == '"v1"': return 304, {"ETag": '"v1"'}, b""
+        return 200, {"ETag": '"v1"', "Link": '<https://example.invalid/next>; rel="next"'}, {"name": "dxvk"}
+    stub_server.route(app)
+    client = GitHubClient(stub_server.url, token="t", cache_dir=str(tmp_path))
+    first = client.request("GET", "repos/o/r")
+    # A fresh client reads the same on-disk cache.
+    client = GitHubClient(stub_server.url, token="t", cache_dir=str(tmp_path))
+    status, headers, body = client.request("GET", "repos/o/r")
+    assert (status, body) == (200, first[2]) == (200, {"name": "dxvk"})
+    assert headers["link"] == first[1]["link"]
+    assert client.stats["not_modified"] == 1
+    assert stub_server.requests[-1]["headers"]["if-none-match"] == '"v1"'
+
+def test_rate_limited_requests_are_retried(stub_server, sleeps):
+    answers = [(429, {"Retry-After": "7"}, {"message": "Too many requests"}),
+               (403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(int(time.time()) + 30)}, {"message": "API rate limit exceeded"}),
+               (200, {}, {"ok": True})]
+    stub_server.route(lambda request: answers.pop(0))
+    client = GitHubClient(stub_server.url, token="t", cache_dir=None)
+    assert client.get("repos/o/r") == {"ok": True}
+    assert client.stats["retries"] == 2 and len(stub_server.requests) == 3
+    assert 6 < sleeps[0] <= 7 and 25 < sleeps[1] <= 32
+
+def test_plain_permission_error_is_not_retried(stub_server, sleeps):
+    stub_server.route(lambda request: (403, {}, {"message": "Resource not accessible by integration"}))
+    client = GitHubClient(stub_server.url, token="t", cache_dir=None)
+    with pytest.raises(GitHubError) as error: client.get("repos/o/r")
+    assert error.value.status == 403 and len(stub_server.requests) == 1 and not sleeps
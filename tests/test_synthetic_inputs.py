@@ -0,0 +1,22 @@
+import time
+
+import pytest
+
+from scripts import synthetic_inputs
+from scripts.verify import pe_machine
+
+MAKERS = [synthetic_inputs.make_dxvk_release, synthetic_inputs.make_vkd3d_proton_release, synthetic_inputs.make_dxvk_dev_build]
+
+@pytest.mark.parametrize("make", MAKERS)
+def test_same_seed_gives_identical_archives(make, tmp_path, monkeypatch):
+    outputs = []
+    for clock in (1_000_000_000.0, 1_700_000_000.0):
+        monkeypatch.setattr(time, "time", lambda clock=clock: clock)
+        (tmp_path / str(clock)).mkdir()
+        with open(make(str(tmp_path / str(clock)), dll_count=2, dll_size=16 * 1024), 'rb') as f: outputs.append(f.read())
+    assert outputs[0] == outputs[1]
+
+def test_synthetic_dlls_carry_the_machine_of_their_folder():
+    rng = synthetic_inputs.random.Random(0)
+    assert pe_machine(synthetic_inputs.synthetic_dll(8192, rng, synthetic_inputs.ARCH_MACHINES["x64"])) == "x64"
+    assert pe_machine(synthetic_inputs.synthetic_dll(8192, rng, synthetic_inputs.ARCH_MACHINES["x32"])) == "i386"
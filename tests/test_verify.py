@@ -0,0 +1,21 @@
+import io, struct
+
+import pytest
+
+from scripts import verify
+
+def _pe(machine=0x8664, size=0x200):
+    head = bytearray(size)
+    head[:2], head[0x3c:0x40] = b"MZ", struct.pack("<I", 0x80)
+    head[0x80:0x86] = b"PE\0\0" + struct.pack("<H", machine)
+    return bytes(head)
+
+def test_pe_machine_reads_the_file_header():
+    assert verify.pe_machine(_pe(0x8664)) == "x64"
+    assert verify.pe_machine(_pe(0x14c)) == "i386"
+
+def test_truncated_pe_file_is_reported_not_raised():
+    # Cut off right after the 'PE\0\0' signature, before the machine field.
+    truncated = _pe()[:0x84]
+    with pytest.raises(ValueError, match="truncated"): verify.pe_machine(truncated)
+    assert verify._scan_member(io.BytesIO(truncated), "system32/d3d11.dll", False) == {"pe_error": "truncated PE header"}